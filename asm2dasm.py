@@ -7,9 +7,59 @@ encodings to create corresponding disassembler test files.
 """
 
 import argparse
+import difflib
+import hashlib
+import json
+import os
 import re
+import shlex
+import subprocess
 import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Iterable, Iterator
+
+# File in each batch output directory recording what every output was
+# generated from, so that up-to-date outputs can be skipped
+STAMP_NAME = ".asm2dasm-stamps.json"
+
+# Mode of newly created outputs, as open() would create them. The umask can
+# only be read by setting it, so this is done once, before any other threads
+UMASK = os.umask(0)
+os.umask(UMASK)
+NEW_FILE_MODE = 0o666 & ~UMASK
+
+# Encoding printed by llvm-mc -show-encoding, e.g. "0x00,0x00,0x8f,0xcc" in
+# "v_wmma_bf16f32_32x64x32_bf16 ... ; encoding: [0x00,0x00,0x8f,0xcc]"
+PATTERN_ENCODING = re.compile(r";\s*encoding:\s*\[([^\]]+)\]")
+
+# Comment line with a check prefix, e.g. "// GFX12: v_nop ; encoding: [...]",
+# capturing the prefix, the content and, by looking ahead, the first encoding
+PATTERN_CHECK = re.compile(
+    rf"^[/#]+\s*(\w[\w-]*):\s*((?=(?:.*?{PATTERN_ENCODING.pattern})?).*)$"
+)
+
+# Prefixes of header comment lines that look like check lines
+HEADER_PREFIXES = ("RUN", "NOTE")
+
+# Placeholder replaced by the check prefix in output paths with --check-prefixes
+PREFIX_PLACEHOLDER = "{prefix}"
+
+# Byte of an encoding, in asm check lines and in dasm tests
+PATTERN_BYTE = re.compile(r"0x([0-9a-fA-F]+)")
+
+# Options of an llvm-mc RUN line that select the target to disassemble for
+MC_TARGET_OPTIONS = ("triple", "arch", "mcpu", "mattr")
+
+# Instruction printed by llvm-mc --disassemble -show-encoding and its encoding
+PATTERN_MC_OUTPUT = re.compile(r"^\s*(.*?)\s*;\s*encoding:\s*\[([^\]]*)\]")
+
+# Warning of llvm-mc --disassemble about an input line that does not decode
+PATTERN_MC_INVALID = re.compile(
+    r"^<stdin>:(\d+):\d+: warning: invalid instruction encoding"
+)
 
 
 def parse_args():
@@ -17,13 +67,13 @@ def parse_args():
     parser.add_argument(
         "input",
         type=Path,
+        nargs="?",
         help="Input asm test file",
     )
     parser.add_argument(
         "--output",
         "-o",
         type=Path,
-        required=True,
         help="Output dasm test file",
     )
     parser.add_argument(
@@ -32,128 +82,359 @@ def parse_args():
         default=None,
         help="Check prefix to filter which check line to use when multiple exist",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--check-prefixes",
+        type=lambda value: value.split(","),
+        default=None,
+        metavar="PREFIX,...",
+        help=(
+            "Parse the input once and write one output per check prefix, with "
+            f"'{PREFIX_PLACEHOLDER}' in the output path replaced by the prefix"
+        ),
+    )
+    parser.add_argument(
+        "--batch",
+        nargs=2,
+        action="append",
+        type=Path,
+        metavar=("IN_DIR", "OUT_DIR"),
+        help=(
+            "Convert every .s file under IN_DIR into a .txt file under OUT_DIR, "
+            "with 'asm' in the file name replaced by 'dasm' (can be repeated)"
+        ),
+    )
+    parser.add_argument(
+        "--mapping",
+        type=Path,
+        help=(
+            "Convert the files listed in a mapping file, one 'INPUT OUTPUT' pair "
+            "per line, relative to the mapping file"
+        ),
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=os.cpu_count() or 4,
+        help="Number of files to convert in parallel in batch mode",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Regenerate outputs in batch mode even if they are up to date",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help=(
+            "Update existing outputs in place: entries whose encoding is still "
+            "generated are kept byte for byte with their check lines, new "
+            "encodings are added without check lines and others are removed"
+        ),
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help=(
+            "Disassemble the encodings of each output with llvm-mc and report "
+            "instructions that do not match their check line"
+        ),
+    )
+    parser.add_argument(
+        "--llvm-mc",
+        type=str,
+        default="llvm-mc",
+        help="llvm-mc binary to use for --verify",
+    )
+    parser.add_argument(
+        "--mc-args",
+        type=shlex.split,
+        default=None,
+        help=(
+            "Target options for llvm-mc, e.g. '-triple=amdgcn -mcpu=gfx1200'; "
+            "by default they are taken from the llvm-mc RUN line of the input "
+            "that checks the prefix"
+        ),
+    )
+    args = parser.parse_args()
+
+    if args.batch or args.mapping:
+        if args.input or args.output:
+            parser.error("input and --output cannot be used with --batch or --mapping")
+    elif not args.input or not args.output:
+        parser.error("input and --output are required")
+
+    if args.check_prefix and args.check_prefixes:
+        parser.error("--check-prefix cannot be combined with --check-prefixes")
+    args.prefixes = args.check_prefixes or [args.check_prefix]
+    if (
+        len(args.prefixes) > 1
+        and args.output
+        and PREFIX_PLACEHOLDER not in str(args.output)
+    ):
+        parser.error(f"--check-prefixes needs '{PREFIX_PLACEHOLDER}' in --output")
+    return args
+
+
+@dataclass(slots=True)
+class CheckLine:
+    """
+    A check line of an instruction block, with the encoding it carries.
+    """
 
+    prefix: str
+    content: str
+    raw: str
+    encoding: str | None
 
-def parse_asm_blocks(content: str) -> list[dict]:
+
+@dataclass(slots=True)
+class AsmBlock:
+    """
+    An instruction line and the check lines that follow it.
     """
-    Parse the ASM file content into blocks.
 
-    Each block contains:
-    - instruction: the actual instruction line
-    - check_lines: list of check lines (with their prefix and content)
+    instruction: str
+    line: int
+    check_lines: list[CheckLine] = field(default_factory=list)
+
+
+def iter_asm_blocks(lines: Iterable[str]) -> Iterator[AsmBlock]:
+    """
+    Parse the lines of an ASM file into blocks, yielding each one as soon as
+    it is complete.
+
+    Each block holds the instruction line, its line number and its check
+    lines; the encoding of each check line is extracted while parsing.
     """
-    lines = content.splitlines()
-    blocks = []
     current_block = None
 
-    for line in lines:
+    for number, line in enumerate(lines, 1):
         stripped = line.strip()
 
         # Skip empty lines - they separate blocks
         if not stripped:
-            if current_block and current_block.get("instruction"):
-                blocks.append(current_block)
+            if current_block is not None:
+                yield current_block
             current_block = None
             continue
 
-        # Skip RUN lines and NOTE lines at the top
-        if stripped.startswith("//") or stripped.startswith("#"):
-            comment_content = stripped.lstrip("/#").strip()
-            # Check if this is a RUN or NOTE line (header lines)
-            if comment_content.startswith("RUN:") or comment_content.startswith(
-                "NOTE:"
-            ):
+        if stripped.startswith(("//", "#")):
+            # Check lines have format: // PREFIX: content
+            match = PATTERN_CHECK.match(stripped)
+            if match is None or current_block is None:
                 continue
+            prefix, check_content, encoding = match.groups()
 
-            # Check if this is a check line (e.g., "// GFX1260: ...")
-            # Check lines have format: // PREFIX: content
-            match = re.match(r"^[/#]+\s*(\w[\w-]*):\s*(.*)$", stripped)
-            if match and current_block:
-                prefix = match.group(1)
-                check_content = match.group(2)
-                current_block["check_lines"].append(
-                    {
-                        "prefix": prefix,
-                        "content": check_content,
-                        "raw": stripped,
-                    }
-                )
+            # Skip RUN and NOTE lines at the top
+            if prefix in HEADER_PREFIXES:
+                continue
+
+            current_block.check_lines.append(
+                CheckLine(prefix, check_content, stripped, encoding)
+            )
             continue
 
-        # This is an instruction line
-        if current_block is None:
-            current_block = {"instruction": stripped, "check_lines": []}
-        else:
-            # If we already have an instruction, this shouldn't happen
-            # but handle it by starting a new block
-            if current_block.get("instruction"):
-                blocks.append(current_block)
-            current_block = {"instruction": stripped, "check_lines": []}
+        # This is an instruction line; a second one starts a new block
+        if current_block is not None:
+            yield current_block
+        current_block = AsmBlock(stripped, number)
 
     # Don't forget the last block
-    if current_block and current_block.get("instruction"):
-        blocks.append(current_block)
-
-    return blocks
+    if current_block is not None:
+        yield current_block
 
 
-def extract_encoding(check_content: str) -> str | None:
+def parse_asm_blocks(content: str) -> list[AsmBlock]:
     """
-    Extract encoding from a check line content.
-
-    Example input: "v_wmma_bf16f32_32x64x32_bf16 v[0:31], ... ; encoding: [0x00,0x00,0x8f,0xcc,0x20,0x61,0x02,0x1f]"
-    Example output: "0x00,0x00,0x8f,0xcc,0x20,0x61,0x02,0x1f"
+    Parse the ASM file content into blocks.
     """
-    match = re.search(r";\s*encoding:\s*\[([^\]]+)\]", check_content)
-    if match:
-        return match.group(1)
-    return None
+    return list(iter_asm_blocks(content.splitlines()))
 
 
-def get_encoding_from_block(block: dict, check_prefix: str | None) -> str:
+def get_encoding_from_block(block: AsmBlock, check_prefix: str | None) -> str:
     """
     Get the encoding from a block's check lines.
 
     If check_prefix is provided, only use check lines with that prefix.
     If not provided, there must be exactly one check line with encoding.
     """
-    check_lines_with_encoding = []
+    return get_check_line_from_block(block, check_prefix).encoding
 
-    for check_line in block["check_lines"]:
-        encoding = extract_encoding(check_line["content"])
-        if encoding:
-            check_lines_with_encoding.append(
-                {
-                    "prefix": check_line["prefix"],
-                    "encoding": encoding,
-                }
-            )
+
+def get_check_line_from_block(block: AsmBlock, check_prefix: str | None) -> CheckLine:
+    """
+    Get the check line whose encoding is used for a block.
+    """
+    check_lines_with_encoding = [c for c in block.check_lines if c.encoding]
 
     if not check_lines_with_encoding:
-        raise ValueError(f"No encoding found for instruction: {block['instruction']}")
+        raise ValueError(f"No encoding found for instruction: {block.instruction}")
 
     if check_prefix:
         # Filter by prefix
-        matching = [c for c in check_lines_with_encoding if c["prefix"] == check_prefix]
+        matching = [c for c in check_lines_with_encoding if c.prefix == check_prefix]
         if not matching:
             raise ValueError(
-                f"No check line with prefix '{check_prefix}' found for instruction: {block['instruction']}"
+                f"No check line with prefix '{check_prefix}' found for instruction: {block.instruction}"
             )
         if len(matching) > 1:
             raise ValueError(
-                f"Multiple check lines with prefix '{check_prefix}' have encoding for instruction: {block['instruction']}"
+                f"Multiple check lines with prefix '{check_prefix}' have encoding for instruction: {block.instruction}"
             )
-        return matching[0]["encoding"]
+        return matching[0]
     else:
         # No prefix specified - must have exactly one encoding
         if len(check_lines_with_encoding) > 1:
-            prefixes = [c["prefix"] for c in check_lines_with_encoding]
+            prefixes = [c.prefix for c in check_lines_with_encoding]
             raise ValueError(
-                f"Multiple check lines have encoding for instruction: {block['instruction']}. "
+                f"Multiple check lines have encoding for instruction: {block.instruction}. "
                 f"Prefixes: {prefixes}. Use --check-prefix to specify which one to use."
             )
-        return check_lines_with_encoding[0]["encoding"]
+        return check_lines_with_encoding[0]
+
+
+def find_mc_args(content: str, check_prefix: str | None) -> list[str] | None:
+    """
+    Find the target options of the llvm-mc RUN line that checks a prefix.
+
+    Without a check prefix the first llvm-mc RUN line is used. Returns None
+    if there is no such RUN line.
+    """
+    commands = []
+    command = ""
+    for line in content.splitlines():
+        match = PATTERN_CHECK.match(line.strip())
+        if match is None or match.group(1) != "RUN":
+            continue
+        command += match.group(2)
+        if command.endswith("\\"):
+            command = command[:-1] + " "
+            continue
+        commands.append(command)
+        command = ""
+
+    for command in commands:
+        mc, _, filecheck = command.partition("|")
+        try:
+            mc_tokens = shlex.split(mc)
+            filecheck_tokens = shlex.split(filecheck)
+        except ValueError:
+            continue
+        if not any(token.endswith("llvm-mc") for token in mc_tokens):
+            continue
+
+        prefixes = []
+        for i, token in enumerate(filecheck_tokens):
+            name, _, value = token.lstrip("-").partition("=")
+            if name in ("check-prefix", "check-prefixes"):
+                if not value and i + 1 < len(filecheck_tokens):
+                    value = filecheck_tokens[i + 1]
+                prefixes.extend(value.split(","))
+        if check_prefix is not None and check_prefix not in (prefixes or ["CHECK"]):
+            continue
+
+        mc_args = []
+        for i, token in enumerate(mc_tokens):
+            name, equals, _ = token.lstrip("-").partition("=")
+            if not token.startswith("-") or name not in MC_TARGET_OPTIONS:
+                continue
+            mc_args.append(token)
+            if not equals and i + 1 < len(mc_tokens):
+                mc_args.append(mc_tokens[i + 1])
+        return mc_args
+
+    return None
+
+
+def verify_file(
+    input_path: Path,
+    check_prefix: str | None,
+    llvm_mc: str,
+    mc_args: list[str] | None,
+) -> list[str]:
+    """
+    Disassemble the encodings of an asm test and compare them to its checks.
+
+    All encodings go to a single llvm-mc process, each as a bracketed group
+    on its own line so that one that does not decode cannot shift the rest.
+    The output is matched back to the blocks by the bytes of each encoding.
+    Returns a message for each instruction that does not disassemble to the
+    text of its check line.
+    """
+    content = input_path.read_text()
+    if mc_args is None:
+        mc_args = find_mc_args(content, check_prefix)
+        if mc_args is None:
+            return [f"No llvm-mc RUN line checks prefix '{check_prefix or 'CHECK'}'"]
+
+    try:
+        entries = [
+            (block, get_check_line_from_block(block, check_prefix))
+            for block in iter_asm_blocks(content.splitlines())
+        ]
+    except ValueError as e:
+        return [str(e)]
+
+    try:
+        proc = subprocess.run(
+            [llvm_mc, "--disassemble", "-show-encoding", *mc_args],
+            input="".join(f"[{check.encoding}]\n" for _, check in entries),
+            capture_output=True,
+            text=True,
+        )
+    except OSError as e:
+        return [f"Cannot run {llvm_mc}: {e}"]
+
+    invalid = set()
+    for line in proc.stderr.splitlines():
+        match = PATTERN_MC_INVALID.match(line)
+        if match:
+            invalid.add(int(match.group(1)))
+    if proc.returncode != 0 and not invalid:
+        return [f"{llvm_mc} failed: {proc.stderr.strip()}"]
+    decoded = [
+        (text, encoding_key(encoding))
+        for text, encoding in (
+            match.groups()
+            for match in map(PATTERN_MC_OUTPUT.match, proc.stdout.splitlines())
+            if match
+        )
+    ]
+
+    mismatches = []
+    position = 0
+    for number, (block, check) in enumerate(entries, 1):
+        location = f"line {block.line}: {block.instruction}"
+
+        # An encoding with trailing bytes disassembles to several instructions,
+        # and one that does not decode may still print those before the bad
+        # bytes. llvm-mc re-encodes what it decodes, so a valid encoding that
+        # is not canonical is matched by size instead.
+        want = encoding_key(check.encoding)
+        offset = 0
+        texts = []
+        while offset < len(want) and position < len(decoded):
+            text, got = decoded[position]
+            if want[offset : offset + len(got)] != got and (
+                number in invalid or offset + len(got) > len(want)
+            ):
+                break
+            position += 1
+            offset += len(got)
+            texts.append(text)
+
+        if number in invalid:
+            mismatches.append(f"{location}: [{check.encoding}] does not disassemble")
+            continue
+
+        expected = check.content[: PATTERN_ENCODING.search(check.content).start()]
+        if len(texts) != 1 or texts[0].split() != expected.split():
+            mismatches.append(
+                f"{location}: disassembles to '{'; '.join(texts)}', "
+                f"expected '{expected.strip()}'"
+            )
+    return mismatches
 
 
 def read_preserved_lines(output_path: Path) -> list[str]:
@@ -200,36 +481,55 @@ def read_preserved_lines(output_path: Path) -> list[str]:
     return preserved
 
 
-def main():
-    args = parse_args()
-
-    # Read input file
-    if not args.input.exists():
-        print(f"Error: Input file does not exist: {args.input}", file=sys.stderr)
-        sys.exit(1)
+def extract_encodings(
+    blocks: Iterable[AsmBlock], check_prefix: str | None
+) -> tuple[list[str], list[str]]:
+    """
+    Get the encoding of every block.
 
-    content = args.input.read_text()
+    Returns the encodings and the errors of all blocks without a usable
+    encoding, so that every problem in a file can be reported at once.
+    """
+    encodings, errors = extract_prefix_encodings(blocks, [check_prefix])
+    return encodings[check_prefix], errors
 
-    # Parse into blocks
-    blocks = parse_asm_blocks(content)
 
-    if not blocks:
-        print("Warning: No instruction blocks found in input file", file=sys.stderr)
+def extract_prefix_encodings(
+    blocks: Iterable[AsmBlock], check_prefixes: list[str | None]
+) -> tuple[dict[str | None, list[str]], list[str]]:
+    """
+    Get the encoding of every block for each of several check prefixes.
 
-    # Extract encodings
-    encodings = []
+    The blocks are only walked once. Returns the encodings by prefix and the
+    errors of all blocks without a usable encoding for any of the prefixes.
+    """
+    encodings = {prefix: [] for prefix in check_prefixes}
+    errors = []
     for block in blocks:
-        try:
-            encoding = get_encoding_from_block(block, args.check_prefix)
-            encodings.append(encoding)
-        except ValueError as e:
-            print(f"Error: {e}", file=sys.stderr)
-            sys.exit(1)
+        for prefix in check_prefixes:
+            try:
+                encodings[prefix].append(get_encoding_from_block(block, prefix))
+            except ValueError as e:
+                errors.append(str(e))
+    return encodings, errors
 
-    # Read preserved lines from output file (if exists)
-    preserved_lines = read_preserved_lines(args.output)
 
-    # Build output
+def output_paths(
+    output_path: Path, check_prefixes: list[str | None]
+) -> dict[str | None, Path]:
+    """
+    Map each check prefix to its output path, replacing PREFIX_PLACEHOLDER.
+    """
+    return {
+        prefix: Path(str(output_path).replace(PREFIX_PLACEHOLDER, prefix or ""))
+        for prefix in check_prefixes
+    }
+
+
+def build_output(preserved_lines: list[str], encodings: list[str]) -> str:
+    """
+    Build the dasm test from the preserved header lines and the encodings.
+    """
     output_lines = preserved_lines[:]
 
     # Ensure there's an empty line between preserved lines and encodings
@@ -242,11 +542,433 @@ def main():
         if i < len(encodings) - 1:
             output_lines.append("")
 
-    # Write output
-    args.output.parent.mkdir(parents=True, exist_ok=True)
-    args.output.write_text("\n".join(output_lines) + "\n")
+    return "\n".join(output_lines) + "\n"
+
+
+@dataclass(slots=True)
+class DasmEntry:
+    """
+    An encoding line of a dasm test with the comment lines that belong to it.
+    """
+
+    key: tuple
+    text: str
+    trailing: str = ""
+
+
+def encoding_key(encoding: str) -> tuple:
+    """
+    Key an encoding by its bytes, however they are spelled.
+    """
+    return tuple(int(byte, 16) for byte in PATTERN_BYTE.findall(encoding)) or (
+        encoding.strip(),
+    )
+
+
+def parse_dasm_entries(lines: list[str]) -> tuple[list[DasmEntry], str]:
+    """
+    Split the lines after the header of a dasm test into entries.
+
+    Lines are kept with their line endings. Check lines may come before or
+    after their encoding, which is inferred from the check lines next to the
+    encoding lines. When they come after, comment lines directly after an
+    encoding line belong to it; otherwise comment lines belong to the next
+    encoding line. Blank lines after an entry are its trailing text. Returns
+    the entries and the lines after the last one.
+    """
+    is_check = [bool(PATTERN_CHECK.match(line.strip())) for line in lines]
+    before = after = 0
+    for i, line in enumerate(lines):
+        stripped = line.strip()
+        if stripped and not stripped.startswith(("#", "//")):
+            before += i > 0 and is_check[i - 1]
+            after += i + 1 < len(lines) and is_check[i + 1]
+    checks_before = before > after
+
+    entries = []
+    pending = ""
+
+    for line in lines:
+        stripped = line.strip()
+        current = entries[-1] if entries else None
+
+        if not stripped or stripped.startswith(("#", "//")):
+            if current is not None and not pending:
+                if not stripped:
+                    current.trailing += line
+                    continue
+                if not current.trailing and not checks_before:
+                    current.text += line
+                    continue
+            pending += line
+            continue
+
+        entries.append(DasmEntry(encoding_key(stripped), pending + line))
+        pending = ""
+
+    return entries, pending
+
+
+def update_output(content: str, header_count: int, encodings: list[str]) -> str:
+    """
+    Update a dasm test to hold the given encodings, changing as little as
+    possible.
+
+    Existing entries are lined up with the encodings by their bytes. Entries
+    that line up are kept byte for byte, including their check lines, while
+    entries for new encodings are inserted and the others removed.
+    """
+    lines = content.splitlines(keepends=True)
+    newline = "\r\n" if lines and lines[0].endswith("\r\n") else "\n"
+    header = "".join(lines[:header_count])
+    entries, tail = parse_dasm_entries(lines[header_count:])
+    originally_last = entries[-1] if entries else None
+
+    keys = [encoding_key(encoding) for encoding in encodings]
+    matcher = difflib.SequenceMatcher(
+        None, [entry.key for entry in entries], keys, autojunk=False
+    )
+    # Entries with whether they are new
+    result = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            result.extend((entry, False) for entry in entries[i1:i2])
+        elif tag in ("insert", "replace"):
+            result.extend(
+                (DasmEntry(keys[j], encodings[j] + newline), True)
+                for j in range(j1, j2)
+            )
+
+    # A file that had no entries gets the layout of build_output()
+    pieces = [header]
+    if result and not entries and not tail:
+        if header and not header.endswith("\n"):
+            pieces.append(newline)
+        if header.strip() and header.splitlines()[-1].strip():
+            pieces.append(newline)
+
+    for i, (entry, new) in enumerate(result):
+        last = i == len(result) - 1
+        text, trailing = entry.text, entry.trailing
+        if not last or tail:
+            if not text.endswith("\n"):
+                text += newline
+            # Keep the separators of the entries that were already followed
+            if not last and not trailing and (new or entry is originally_last):
+                trailing = newline
+        pieces.append(text + trailing)
+    pieces.append(tail)
+    return "".join(pieces)
+
+
+def write_if_changed(path: Path, text: str) -> bool:
+    """
+    Atomically replace the contents of a file, unless they are unchanged.
+
+    Returns whether the file was written.
+    """
+    try:
+        with path.open(newline="") as f:
+            if f.read() == text:
+                return False
+        mode = path.stat().st_mode & 0o7777
+    except FileNotFoundError:
+        mode = NEW_FILE_MODE
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        "w", dir=path.parent, prefix=f".{path.name}.", delete=False, newline=""
+    ) as f:
+        f.write(text)
+    os.chmod(f.name, mode)
+    os.replace(f.name, path)
+    return True
+
+
+def convert_file(
+    input_path: Path, outputs: dict[str | None, Path], incremental: bool = False
+) -> tuple[dict[str | None, tuple[int, bool]], list[str]]:
+    """
+    Generate dasm tests from an asm test, one for each check prefix.
+
+    The input is parsed once. Each output keeps its own preserved header,
+    and is only rewritten if its contents change. With incremental, the
+    existing entries of an output are updated instead of being replaced.
+    Returns the number of encodings for each prefix with whether its output
+    was written, and the errors found. Nothing is written if there are
+    errors.
+    """
+    with input_path.open() as f:
+        encodings, errors = extract_prefix_encodings(iter_asm_blocks(f), list(outputs))
+    if errors:
+        return {}, errors
+
+    results = {}
+    for prefix, output_path in outputs.items():
+        preserved_lines = read_preserved_lines(output_path)
+        if incremental and output_path.exists():
+            with output_path.open(newline="") as f:
+                content = f.read()
+            output = update_output(content, len(preserved_lines), encodings[prefix])
+        else:
+            output = build_output(preserved_lines, encodings[prefix])
+        changed = write_if_changed(output_path, output)
+        results[prefix] = (len(encodings[prefix]), changed)
+    return results, []
+
+
+def input_key(input_path: Path, check_prefix: str | None) -> str:
+    """
+    Hash everything an output is generated from besides its own header.
+    """
+    h = hashlib.sha256(input_path.read_bytes())
+    h.update(b"\0" + (check_prefix or "").encode())
+    return h.hexdigest()
 
-    print(f"Generated {len(encodings)} encoding(s) to {args.output}")
+
+def file_digest(path: Path) -> str | None:
+    """
+    Hash the contents of a file, or return None if it does not exist.
+    """
+    try:
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def convert_job(
+    input_path: Path,
+    outputs: dict[str | None, Path],
+    stamps: dict[Path, dict],
+    verify: tuple[str, list[str] | None] | None = None,
+    incremental: bool = False,
+) -> tuple[str, list[str], dict[Path, dict], list[str]]:
+    """
+    Convert one file of a batch unless its outputs are up to date.
+
+    An output is up to date if it was generated from the same input and
+    check prefix and has not changed since; the input is converted again if
+    any of its outputs is not. If verify gives the llvm-mc binary and target
+    options, the encodings of every output are verified as well; with
+    incremental, outputs are updated as by update_output(). Returns
+    the status ("converted", "up to date" or "failed"), the errors, the new
+    stamps of the outputs and the verification mismatches.
+    """
+    try:
+        keys = {
+            output_path: input_key(input_path, prefix)
+            for prefix, output_path in outputs.items()
+        }
+        if all(
+            output_path in stamps
+            and stamps[output_path].get("input") == key
+            and stamps[output_path].get("output") == file_digest(output_path)
+            for output_path, key in keys.items()
+        ):
+            status = "up to date"
+        else:
+            _, errors = convert_file(input_path, outputs, incremental)
+            if errors:
+                return "failed", errors, {}, []
+            status = "converted"
+            stamps = {
+                output_path: {"input": key, "output": file_digest(output_path)}
+                for output_path, key in keys.items()
+            }
+
+        mismatches = []
+        if verify is not None:
+            for prefix in outputs:
+                mismatches += verify_file(input_path, prefix, *verify)
+    except (OSError, UnicodeDecodeError) as e:
+        return "failed", [str(e)], {}, []
+    return status, [], stamps, mismatches
+
+
+def dasm_name(input_path: Path, per_prefix: bool = False) -> str:
+    """
+    Name the dasm test of an asm test, e.g. gfx12_asm_vop1.s -> gfx12_dasm_vop1.txt.
+
+    With per_prefix, the name ends in "_" and PREFIX_PLACEHOLDER.
+    """
+    stem = re.sub(r"(^|[_-])asm([_-]|$)", r"\1dasm\2", input_path.stem, count=1)
+    if per_prefix:
+        stem += "_" + PREFIX_PLACEHOLDER
+    return stem + ".txt"
+
+
+def collect_batch(args) -> list[tuple[Path, Path]]:
+    """
+    List the input and output file pairs given by --batch and --mapping.
+
+    Outputs may contain PREFIX_PLACEHOLDER, and must if there are several
+    check prefixes.
+    """
+    per_prefix = len(args.prefixes) > 1
+    pairs = []
+    for input_dir, output_dir in args.batch or []:
+        if not input_dir.is_dir():
+            raise ValueError(f"Input directory does not exist: {input_dir}")
+        for input_path in sorted(input_dir.rglob("*.s")):
+            relative = input_path.relative_to(input_dir)
+            name = dasm_name(input_path, per_prefix)
+            pairs.append((input_path, output_dir / relative.parent / name))
+
+    if args.mapping:
+        base = args.mapping.parent
+        for number, line in enumerate(args.mapping.read_text().splitlines(), 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            fields = line.split()
+            if len(fields) != 2:
+                raise ValueError(
+                    f"{args.mapping}:{number}: expected 'INPUT OUTPUT', got: {line}"
+                )
+            if per_prefix and PREFIX_PLACEHOLDER not in fields[1]:
+                raise ValueError(
+                    f"{args.mapping}:{number}: output needs '{PREFIX_PLACEHOLDER}' "
+                    "with --check-prefixes"
+                )
+            pairs.append((base / fields[0], base / fields[1]))
+
+    return pairs
+
+
+def load_stamps(output_dir: Path) -> dict:
+    """
+    Read the stamps of the outputs in a directory.
+    """
+    try:
+        return json.loads((output_dir / STAMP_NAME).read_text())
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def run_batch(args) -> int:
+    """
+    Convert many files in parallel and report all errors at the end.
+    """
+    try:
+        pairs = collect_batch(args)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    jobs = [
+        (input_path, output_paths(output_path, args.prefixes))
+        for input_path, output_path in pairs
+    ]
+    stamps = {}
+    for _, outputs in jobs:
+        for output_path in outputs.values():
+            if output_path.parent not in stamps:
+                stamps[output_path.parent] = load_stamps(output_path.parent)
+
+    verify = (args.llvm_mc, args.mc_args) if args.verify else None
+    with ProcessPoolExecutor(max_workers=max(args.jobs, 1)) as pool:
+        futures = []
+        for input_path, outputs in jobs:
+            old_stamps = {}
+            if not args.force:
+                for output_path in outputs.values():
+                    stamp = stamps[output_path.parent].get(output_path.name)
+                    if stamp is not None:
+                        old_stamps[output_path] = stamp
+            futures.append(
+                pool.submit(
+                    convert_job,
+                    input_path,
+                    outputs,
+                    old_stamps,
+                    verify,
+                    args.incremental,
+                )
+            )
+
+        counts = {"converted": 0, "up to date": 0, "failed": 0}
+        failures = []
+        mismatched = []
+        for (input_path, outputs), future in zip(jobs, futures):
+            status, errors, new_stamps, mismatches = future.result()
+            counts[status] += 1
+            if errors:
+                failures.append((input_path, errors))
+            if mismatches:
+                mismatched.append((input_path, mismatches))
+            for output_path in outputs.values():
+                directory_stamps = stamps[output_path.parent]
+                if output_path in new_stamps:
+                    directory_stamps[output_path.name] = new_stamps[output_path]
+                else:
+                    directory_stamps.pop(output_path.name, None)
+
+    for output_dir, directory_stamps in stamps.items():
+        if directory_stamps:
+            output_dir.mkdir(parents=True, exist_ok=True)
+            (output_dir / STAMP_NAME).write_text(
+                json.dumps(directory_stamps, indent=2, sort_keys=True) + "\n"
+            )
+
+    for input_path, errors in failures:
+        print(f"{input_path}:", file=sys.stderr)
+        for error in errors:
+            print(f"  Error: {error}", file=sys.stderr)
+    for input_path, mismatches in mismatched:
+        print(f"{input_path}:", file=sys.stderr)
+        for mismatch in mismatches:
+            print(f"  Mismatch: {mismatch}", file=sys.stderr)
+
+    summary = (
+        f"Converted {counts['converted']} file(s), {counts['up to date']} up to "
+        f"date, {counts['failed']} failed"
+    )
+    if verify is not None:
+        summary += f", {len(mismatched)} with verification mismatches"
+    print(summary)
+    return 1 if failures or mismatched else 0
+
+
+def main():
+    args = parse_args()
+
+    if args.batch or args.mapping:
+        sys.exit(run_batch(args))
+
+    # Read input file
+    if not args.input.exists():
+        print(f"Error: Input file does not exist: {args.input}", file=sys.stderr)
+        sys.exit(1)
+
+    outputs = output_paths(args.output, args.prefixes)
+    results, errors = convert_file(args.input, outputs, args.incremental)
+    if errors:
+        for error in errors:
+            print(f"Error: {error}", file=sys.stderr)
+        sys.exit(1)
+
+    counts = {prefix: count for prefix, (count, _) in results.items()}
+    if not any(counts.values()):
+        print("Warning: No instruction blocks found in input file", file=sys.stderr)
+
+    for prefix, output_path in outputs.items():
+        if results[prefix][1]:
+            print(f"Generated {counts[prefix]} encoding(s) to {output_path}")
+        else:
+            print(f"{output_path} is up to date ({counts[prefix]} encoding(s))")
+
+    if args.verify:
+        failed = False
+        for prefix, output_path in outputs.items():
+            mismatches = verify_file(args.input, prefix, args.llvm_mc, args.mc_args)
+            for mismatch in mismatches:
+                print(f"Mismatch: {mismatch}", file=sys.stderr)
+            if mismatches:
+                failed = True
+            else:
+                print(f"Verified {counts[prefix]} encoding(s) in {output_path}")
+        if failed:
+            sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -1,16 +1,28 @@
 #!/usr/bin/env python3
 
 import argparse
+import hashlib
 import json
 import logging
 import os
+import re
 import sys
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, TextIO, Tuple
 
 # Set up logger
 logger = logging.getLogger(os.path.basename(__file__))
 
+# Number of characters read at a time from each file in streaming mode
+STREAM_CHUNK_SIZE = 1 << 20
+
+# Whitespace between the elements of a JSON array
+JSON_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+# Most characters from a decode error to the end of a chunk that was cut in
+# the middle of a token, as in a \uXXXX escape missing its last digit
+PARTIAL_TOKEN_LENGTH = 5
+
 
 def setup_logging(verbose: bool = False):
     """Set up logging configuration."""
@@ -67,6 +79,155 @@ def load_compile_commands(file_path: Path) -> List[Dict[str, Any]]:
         return []
 
 
+def iter_compile_commands(
+    file_path: Path, chunk_size: int = STREAM_CHUNK_SIZE
+) -> Iterator[Any]:
+    """
+    Parse the entries of a compile_commands.json file one at a time.
+
+    Only one chunk of the file and the entry being parsed are held in memory.
+    Unlike load_compile_commands(), entries before a parse error are still
+    produced.
+
+    Args:
+        file_path: Path to the compile_commands.json file
+        chunk_size: Number of characters to read at a time
+
+    Yields:
+        Compilation database entries
+    """
+    decoder = json.JSONDecoder()
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            buffer = ""
+            pos = 0
+            eof = False
+            # What comes next: "[", the first entry or "]", "," or "]", an entry,
+            # nothing but whitespace
+            state = "start"
+
+            while True:
+                pos = JSON_WHITESPACE.match(buffer, pos).end()
+                if pos == len(buffer):
+                    if eof:
+                        break
+                    chunk = f.read(chunk_size)
+                    eof = not chunk
+                    buffer = buffer[pos:] + chunk
+                    pos = 0
+                    continue
+
+                char = buffer[pos]
+                if state == "end":
+                    logger.warning(f"{file_path} has data after the JSON array")
+                    return
+                elif state == "start":
+                    if char != "[":
+                        logger.warning(f"{file_path} does not contain a JSON array")
+                        return
+                    pos += 1
+                    state = "first"
+                elif state in ("first", "separator") and char == "]":
+                    pos += 1
+                    state = "end"
+                elif state == "separator":
+                    if char != ",":
+                        logger.error(
+                            f"Error parsing {file_path}: expected ',' or ']' "
+                            f"before {buffer[pos:pos + 20]!r}"
+                        )
+                        return
+                    pos += 1
+                    state = "entry"
+                else:
+                    try:
+                        entry, end = decoder.raw_decode(buffer, pos)
+                    except json.JSONDecodeError as e:
+                        # Only an entry cut off by the end of the buffer may
+                        # still be completed by the next chunk
+                        if eof or (
+                            not e.msg.startswith("Unterminated string")
+                            and len(buffer) - e.pos > PARTIAL_TOKEN_LENGTH
+                        ):
+                            logger.error(f"Error parsing {file_path}: {e.msg}")
+                            return
+                        end = len(buffer)
+                    # An entry that ends the buffer may continue in the next chunk
+                    if end == len(buffer) and not eof:
+                        chunk = f.read(chunk_size)
+                        eof = not chunk
+                        buffer = buffer[pos:] + chunk
+                        pos = 0
+                        continue
+                    pos = end
+                    state = "separator"
+                    yield entry
+
+            if state == "start":
+                logger.warning(f"{file_path} does not contain a JSON array")
+            elif state != "end":
+                logger.error(f"Error parsing {file_path}: unexpected end of file")
+    except Exception as e:
+        logger.error(f"Error reading {file_path}: {e}")
+
+
+def entry_key(command: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+    """
+    Get the key identifying duplicate compilation database entries.
+
+    Args:
+        command: Compilation database entry
+
+    Returns:
+        The normalized file path and the command, or None if the entry does
+        not have both
+    """
+    if "file" in command and "command" in command:
+        # Normalize the file path to handle different representations
+        return (os.path.normpath(command["file"]), command["command"])
+    return None
+
+
+def hash_entry_key(key: Tuple[str, str]) -> bytes:
+    """
+    Hash an entry key into a compact digest for duplicate detection.
+
+    Args:
+        key: Key returned by entry_key()
+
+    Returns:
+        128-bit digest of the key
+    """
+    data = f"{key[0]}\0{key[1]}".encode("utf-8", "surrogatepass")
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+class JsonArrayWriter:
+    """
+    Write a JSON array one element at a time.
+
+    The output is formatted exactly like json.dump(..., indent=2,
+    ensure_ascii=False) of the whole array.
+    """
+
+    def __init__(self, f: TextIO):
+        self.f = f
+        self.count = 0
+        self.encoder = json.JSONEncoder(indent=2, ensure_ascii=False)
+
+    def write(self, value: Any) -> None:
+        """Append an element to the array."""
+        self.f.write("[\n  " if self.count == 0 else ",\n  ")
+        # Strings in JSON cannot contain raw newlines, so this only indents
+        text = self.encoder.encode(value)
+        self.f.write(text.replace("\n", "\n  "))
+        self.count += 1
+
+    def close(self) -> None:
+        """Terminate the array."""
+        self.f.write("\n]" if self.count else "[]")
+
+
 def merge_compile_commands(directory: Path) -> List[Dict[str, Any]]:
     """
     Merge all compile_commands.json files found in the directory tree.
@@ -97,13 +258,10 @@ def merge_compile_commands(directory: Path) -> List[Dict[str, Any]]:
         for command in commands:
             # Create a unique identifier for each entry to avoid duplicates
             # Use file path and command as the key
-            if "file" in command and "command" in command:
-                # Normalize the file path to handle different representations
-                file_key = os.path.normpath(command["file"])
-                entry_key = (file_key, command["command"])
-
-                if entry_key not in seen_entries:
-                    seen_entries.add(entry_key)
+            key = entry_key(command)
+            if key is not None:
+                if key not in seen_entries:
+                    seen_entries.add(key)
                     merged_commands.append(command)
                 else:
                     logger.debug(f"Skipping duplicate entry for {command['file']}")
@@ -116,6 +274,79 @@ def merge_compile_commands(directory: Path) -> List[Dict[str, Any]]:
     return merged_commands
 
 
+def merge_compile_commands_streaming(directory: Path, output_path: Path) -> int:
+    """
+    Merge all compile_commands.json files found in the directory tree,
+    writing entries to the output as they are accepted.
+
+    Entries are parsed one at a time and only a hash of the key of each
+    accepted entry is kept, so memory use does not depend on the size of
+    the databases. The output is written to a temporary file that replaces
+    output_path once the merge is complete.
+
+    Args:
+        directory: The root directory to search in
+        output_path: Path where to save the merged file
+
+    Returns:
+        Number of entries written
+    """
+    compile_commands_files = find_compile_commands_files(directory)
+
+    if not compile_commands_files:
+        logger.error(f"No compile_commands.json files found in {directory}")
+        return 0
+
+    logger.info(f"Found {len(compile_commands_files)} compile_commands.json files:")
+    for file_path in compile_commands_files:
+        logger.info(f"  - {file_path}")
+
+    seen_hashes = set()
+    temp_path = output_path.with_name(f".{output_path.name}.tmp")
+    try:
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(temp_path, "w", encoding="utf-8") as f:
+            writer = JsonArrayWriter(f)
+            for file_path in compile_commands_files:
+                loaded = 0
+                for command in iter_compile_commands(file_path):
+                    loaded += 1
+                    if not isinstance(command, dict):
+                        logger.warning(f"Skipping non-object entry in {file_path}")
+                        continue
+
+                    key = entry_key(command)
+                    if key is not None:
+                        key_hash = hash_entry_key(key)
+                        if key_hash in seen_hashes:
+                            logger.debug(
+                                f"Skipping duplicate entry for {command['file']}"
+                            )
+                            continue
+                        seen_hashes.add(key_hash)
+                    else:
+                        # If the entry doesn't have required fields, include it anyway
+                        logger.warning(
+                            f"Entry missing 'file' or 'command' field: {command}"
+                        )
+                    writer.write(command)
+                logger.debug(f"Loaded {loaded} entries from {file_path}")
+            writer.close()
+
+        if writer.count:
+            os.replace(temp_path, output_path)
+            logger.info(f"Merged compile_commands.json saved to: {output_path}")
+        else:
+            temp_path.unlink()
+    except Exception as e:
+        logger.error(f"Error saving to {output_path}: {e}")
+        temp_path.unlink(missing_ok=True)
+        sys.exit(1)
+
+    logger.info(f"Merged {writer.count} unique compilation entries")
+    return writer.count
+
+
 def save_compile_commands(commands: List[Dict[str, Any]], output_path: Path) -> None:
     """
     Save the merged compile commands to a JSON file.
@@ -147,6 +378,7 @@ Examples:
   %(prog)s -d /path/to/project -o merged_compile_commands.json
   %(prog)s --dir . --output ./build/compile_commands.json
   %(prog)s -d . -o merged.json --verbose
+  %(prog)s -d /path/to/monorepo -o merged.json --stream
         """,
     )
 
@@ -166,6 +398,15 @@ Examples:
         help="Output path for the merged compile_commands.json file",
     )
 
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help=(
+            "Parse and write entries one at a time, so memory use stays flat "
+            "however large the compile_commands.json files are"
+        ),
+    )
+
     parser.add_argument(
         "-v",
         "--verbose",
@@ -193,6 +434,13 @@ Examples:
         logger.error(f"{input_dir} is not a directory")
         sys.exit(1)
 
+    if args.stream:
+        if not merge_compile_commands_streaming(input_dir, output_path):
+            logger.error("No compilation entries to merge")
+            sys.exit(1)
+        logger.info("Merge operation completed successfully")
+        return
+
     # Merge compile commands
     merged_commands = merge_compile_commands(input_dir)
 
@@ -7,16 +7,37 @@ using the appropriate update script (e.g., update_llc_test_checks.py).
 """
 
 import argparse
+import contextlib
+import difflib
+import fnmatch
+import functools
+import hashlib
+import heapq
+import importlib.util
+import json
 import logging
 import os
+import re
+import resource
+import shutil
 import subprocess
 import sys
+import tempfile
 import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from dataclasses import dataclass
+import xml.etree.ElementTree as ET
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from dataclasses import asdict, dataclass, field
 from pathlib import Path
-from typing import Optional
+from types import ModuleType
+from typing import Any, Iterable, Iterator, Optional, TextIO
 
 PROG_NAME = "update-test"
 
@@ -29,6 +50,16 @@ TEST_UPDATERS = {
     "update_mc_test_checks.py": "llvm-mc",
 }
 
+# LLVM tools run by each kind of test updater. These are also the names of
+# the tools' ninja targets.
+UPDATER_TOOLS = {
+    "cc": ("clang",),
+    "llc": ("llc",),
+    "mir": ("llc",),
+    "opt": ("opt",),
+    "llvm-mc": ("llvm-mc",),
+}
+
 # Mapping of lit test suite prefixes to their test directories
 # relative to LLVM source root
 TEST_SUITE_DIRS = {
@@ -51,8 +82,64 @@ TEST_SUITE_DIRS = {
 # Default test directory when no prefix is specified
 DEFAULT_TEST_DIR = "llvm/test"
 
+# Directories skipped when scanning test suites, as lit does not run tests
+# in them
+SCAN_EXCLUDED_DIRS = {"Inputs"}
+
+# Number of bytes read from each file to find its autogenerated header
+HEADER_PEEK_BYTES = 256
+
+# Directory holding the updater scripts, relative to LLVM source root
+UPDATER_DIR = "llvm/utils"
+
+# Tools whose binaries determine the output of the updater scripts
+CACHE_KEY_TOOLS = ("llc", "opt", "clang", "llvm-mc")
+
+# Default directory for persistent state such as the skip cache and the
+# recorded test durations
+DEFAULT_CACHE_DIR = (
+    Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / PROG_NAME
+)
+
+# Default maximum number of entries kept in the skip cache
+DEFAULT_CACHE_SIZE = 100000
+
+# Failing test line printed by lit, e.g. "FAIL: LLVM :: CodeGen/test.ll (1 of 9)"
+LIT_FAIL_LINE = re.compile(r"^FAIL: (.+?)(?: \(\d+ of \d+\))?\s*$")
+
+# Header of the list of failing tests in lit's end-of-run summary
+LIT_FAILED_TESTS_HEADER = re.compile(r"^Failed Tests \(\d+\):")
+
+# Start of an xunit XML report written by lit --xunit-xml-output
+LIT_XML_START = re.compile(r"^\s*<(\?xml|testsuites)\b")
+
+# Last line of interest in lit output, in text or xunit XML form
+LIT_END_OF_RUN = re.compile(r"^(Testing Time:|\s*</testsuites>)")
+
+# Default available memory, in MiB, below which --adaptive stops starting
+# new updates
+DEFAULT_MIN_FREE_MEMORY_MB = 2048
+
+# Seconds between adjustments of the adaptive concurrency limit. The
+# 1-minute load average reacts slowly, so adjusting faster would overshoot.
+ADAPTIVE_ADJUST_INTERVAL = 2.0
+
+# Seconds between checks for a free slot while --adaptive holds back jobs
+ADAPTIVE_POLL_INTERVAL = 0.5
+
+# Memory-backed directory for the scratch copies of --diff-only, if present
+DIFF_SCRATCH_ROOT = Path("/dev/shm")
+
+# Estimated update time per byte of test file for tests without recorded
+# durations, used until enough durations have been recorded to derive it
+DEFAULT_SECONDS_PER_BYTE = 1e-5
+
 logger = logging.getLogger(PROG_NAME)
 
+# Updater modules imported by an in-process worker, keyed by the updater
+# script name from TEST_UPDATERS. Each worker process has its own copy.
+_updater_modules: dict[str, ModuleType] = {}
+
 
 class ProgressBar:
     """A simple thread-safe progress bar using only standard library."""
@@ -75,6 +162,21 @@ class ProgressBar:
         self.failure = 0
         self.enabled = sys.stderr.isatty()
         self._lock = threading.Lock()
+        self._open_ended = False
+
+    def add_total(self, count: int = 1) -> None:
+        """
+        Increase the total number of items while processing. Thread-safe.
+
+        Once called, the bar no longer assumes it is complete when it catches
+        up with the total.
+
+        Args:
+            count: Number of items to add
+        """
+        with self._lock:
+            self.total += count
+            self._open_ended = True
 
     def update(self, success: bool = True) -> None:
         """
@@ -126,7 +228,7 @@ class ProgressBar:
         sys.stderr.flush()
 
         # Add newline on completion
-        if self.current == self.total:
+        if self.current == self.total and not self._open_ended:
             sys.stderr.write("\n")
             sys.stderr.flush()
 
@@ -139,7 +241,7 @@ class ProgressBar:
     def close(self) -> None:
         """Close the progress bar, ensuring a newline is written. Thread-safe."""
         with self._lock:
-            if self.enabled and self.current < self.total:
+            if self.enabled and (self.current < self.total or self._open_ended):
                 sys.stderr.write("\n")
                 sys.stderr.flush()
 
@@ -150,16 +252,409 @@ class Config:
 
     llvm_src_root: Path
     llvm_bin_dir: Optional[Path]
-    test_file: Path
+    test_file: Optional[Path]
     verbose: bool
     show_progress: bool
     jobs: int
+    in_process: bool = False
+    cache_dir: Path = DEFAULT_CACHE_DIR
+    use_cache: bool = True
+    cache_size: int = DEFAULT_CACHE_SIZE
+    batch_size: int = 1
+    lit_output: bool = False
+    follow: bool = False
+    rebuild_tools: bool = False
+    report: Optional[Path] = None
+    adaptive: bool = False
+    min_jobs: int = 1
+    min_free_memory_mb: int = DEFAULT_MIN_FREE_MEMORY_MB
+    diff_patch: Optional[Path] = None
+    scratch_dir: Optional[Path] = None
+
+
+@dataclass
+class ResourceUsage:
+    """Resources used by an updater invocation."""
+
+    cpu_time: float = 0.0
+    max_rss_kb: int = 0
+    exit_status: Optional[int] = None
+
+
+@dataclass
+class TestResult:
+    """Outcome of processing a single test file."""
+
+    test_path: Path
+    success: bool
+    wall_time: float = 0.0
+    updater_script: Optional[str] = None
+    usage: ResourceUsage = field(default_factory=ResourceUsage)
+    changed: Optional[bool] = None
+    batch_size: int = 1
+    diff_path: Optional[Path] = None
 
 
 class TestUpdateError(Exception):
     """Exception raised when test update fails."""
 
-    pass
+    def __init__(self, message: str, usage: Optional[ResourceUsage] = None):
+        """
+        Initialize the error.
+
+        Args:
+            message: Description of the failure
+            usage: Resources used by the failed updater invocation, if any
+        """
+        super().__init__(message)
+        self.usage = usage
+
+
+def load_state_file(path: Path) -> Any:
+    """
+    Load a JSON file holding persistent state of this tool.
+
+    Args:
+        path: Path to the state file
+
+    Returns:
+        The decoded JSON data, or None if the file is missing or unreadable
+    """
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (IOError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable state file {path}: {e}")
+        return None
+
+
+def save_state_file(path: Path, data: Any) -> None:
+    """
+    Atomically write a JSON file holding persistent state of this tool.
+
+    Args:
+        path: Path to the state file
+        data: JSON-serializable data to write
+    """
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"Failed to save state file {path}: {e}")
+
+
+class SkipCache:
+    """
+    Content-addressed cache of tests known to be up to date.
+
+    Each entry is a hash over a test's path and contents right after a
+    successful update, salted with a fingerprint of the tool binaries and the
+    updater scripts. A test whose current hash is in the cache would be
+    regenerated to identical output, so it can be skipped. Entries are
+    evicted least-recently-used first once the cache exceeds max_entries.
+    """
+
+    FILE_NAME = "skip-cache.json"
+
+    def __init__(self, cache_dir: Path, max_entries: int, salt: str):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir: Directory holding the cache file
+            max_entries: Maximum number of entries to keep
+            salt: Fingerprint of everything besides the test that affects the
+                updater output (see compute_cache_salt)
+        """
+        self.path = cache_dir / self.FILE_NAME
+        self.max_entries = max_entries
+        self.salt = salt
+        self.hits = 0
+        self.misses = 0
+        # Maps entry key to the time it was last used
+        self._entries: dict[str, float] = {}
+
+    def load(self) -> None:
+        """Load the cache from disk. A missing or corrupt file is ignored."""
+        entries = load_state_file(self.path)
+        if isinstance(entries, dict):
+            self._entries = entries
+
+    def save(self) -> None:
+        """Evict the oldest entries if needed and write the cache to disk."""
+        if len(self._entries) > self.max_entries:
+            newest = sorted(self._entries.items(), key=lambda kv: kv[1])[
+                -self.max_entries :
+            ]
+            self._entries = dict(newest)
+
+        save_state_file(self.path, self._entries)
+
+    def _key(self, test_path: Path) -> Optional[str]:
+        """Return the cache key for the current contents of a test."""
+        try:
+            contents = test_path.read_bytes()
+        except OSError:
+            return None
+
+        h = hashlib.sha256(self.salt.encode())
+        h.update(str(test_path).encode())
+        h.update(b"\0")
+        h.update(contents)
+        return h.hexdigest()
+
+    def lookup(self, test_path: Path) -> bool:
+        """
+        Check whether a test is up to date, counting a hit or a miss.
+
+        Args:
+            test_path: Path to the test file
+
+        Returns:
+            True if the test can be skipped, False otherwise
+        """
+        key = self._key(test_path)
+        if key is not None and key in self._entries:
+            self._entries[key] = time.time()
+            self.hits += 1
+            return True
+
+        self.misses += 1
+        return False
+
+    def record(self, test_path: Path) -> None:
+        """Record a test as up to date after it was updated successfully."""
+        key = self._key(test_path)
+        if key is not None:
+            self._entries[key] = time.time()
+
+
+class DurationHistory:
+    """
+    Wall times of past test updates, used to schedule the longest tests first.
+
+    Tests without a recorded duration are estimated from their file size,
+    using the median time per byte over the recorded tests.
+    """
+
+    FILE_NAME = "durations.json"
+
+    def __init__(self, cache_dir: Path):
+        """
+        Initialize the history.
+
+        Args:
+            cache_dir: Directory holding the history file
+        """
+        self.path = cache_dir / self.FILE_NAME
+        # Maps test path to (wall time in seconds, file size in bytes)
+        self._entries: dict[str, tuple[float, int]] = {}
+        self._seconds_per_byte = DEFAULT_SECONDS_PER_BYTE
+
+    def load(self) -> None:
+        """Load the history from disk. A missing or corrupt file is ignored."""
+        entries = load_state_file(self.path)
+        if not isinstance(entries, dict):
+            return
+
+        try:
+            self._entries = {
+                path: (float(entry[0]), int(entry[1]))
+                for path, entry in entries.items()
+            }
+        except (TypeError, ValueError, IndexError) as e:
+            logger.warning(f"Ignoring malformed duration history {self.path}: {e}")
+            return
+
+        rates = sorted(
+            seconds / size for seconds, size in self._entries.values() if size > 0
+        )
+        if rates:
+            self._seconds_per_byte = rates[len(rates) // 2]
+
+    def save(self) -> None:
+        """Write the history to disk."""
+        save_state_file(self.path, self._entries)
+
+    def record(self, test_path: Path, wall_time: float) -> None:
+        """Record the wall time of a successful update of a test."""
+        try:
+            size = test_path.stat().st_size
+        except OSError:
+            return
+        self._entries[str(test_path)] = (wall_time, size)
+
+    def estimate(self, test_path: Path) -> float:
+        """Return the expected update time of a test in seconds."""
+        entry = self._entries.get(str(test_path))
+        if entry is not None:
+            return entry[0]
+
+        try:
+            return test_path.stat().st_size * self._seconds_per_byte
+        except OSError:
+            return 0.0
+
+
+def predict_makespan(durations: list[float], jobs: int) -> float:
+    """
+    Predict the wall time of running jobs in the given order on a worker pool.
+
+    Each job goes to the worker that becomes idle first, which is how the
+    executor hands out submitted work.
+
+    Args:
+        durations: Expected duration of each job, in submission order
+        jobs: Number of parallel workers
+
+    Returns:
+        The predicted time until the last job finishes
+    """
+    workers = [0.0] * max(1, min(jobs, len(durations)))
+    for duration in durations:
+        heapq.heapreplace(workers, workers[0] + duration)
+    return max(workers)
+
+
+def read_mem_available_kb() -> Optional[int]:
+    """Return MemAvailable from /proc/meminfo in KiB, or None if unknown."""
+    try:
+        with open("/proc/meminfo", "r", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def descendant_rss_kb(pid: int) -> int:
+    """
+    Return the total RSS of all descendants of a process in KiB.
+
+    Args:
+        pid: Process whose children, grandchildren, etc. are measured
+
+    Returns:
+        The summed RSS, or 0 if /proc is unavailable
+    """
+    children: dict[int, list[int]] = {}
+    rss_pages: dict[int, int] = {}
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return 0
+
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r", encoding="utf-8") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The command name is in parentheses and may itself contain spaces
+        fields = stat.rpartition(")")[2].split()
+        try:
+            children.setdefault(int(fields[1]), []).append(int(entry))
+            rss_pages[int(entry)] = int(fields[21])
+        except (ValueError, IndexError):
+            continue
+
+    total = 0
+    stack = list(children.get(pid, []))
+    while stack:
+        child = stack.pop()
+        total += rss_pages.get(child, 0)
+        stack.extend(children.get(child, []))
+    return total * os.sysconf("SC_PAGE_SIZE") // 1024
+
+
+class AdaptiveLimit:
+    """
+    Concurrency limit that follows system load and memory pressure.
+
+    The limit moves by one job at a time between min_jobs and max_jobs: it
+    grows while all slots are busy and the 1-minute load average leaves cores
+    idle, and shrinks while the load average exceeds the number of cores.
+    Independently, no new job is admitted while the available memory minus
+    the average RSS of a running update is below min_free_kb.
+    """
+
+    def __init__(self, min_jobs: int, max_jobs: int, min_free_kb: int):
+        """
+        Initialize the limit.
+
+        Args:
+            min_jobs: Lower bound of the limit
+            max_jobs: Upper bound of the limit
+            min_free_kb: Available memory, in KiB, to keep free
+        """
+        self.min_jobs = min_jobs
+        self.max_jobs = max_jobs
+        self.min_free_kb = min_free_kb
+        self.cpus = os.cpu_count() or 1
+        self.current = max(min_jobs, min(max_jobs, self.cpus))
+        self.low = self.high = self.current
+        self._last_adjust = time.monotonic()
+        self._memory_bound = False
+        # Average RSS of a running update, sampled every adjust interval
+        self._per_job_kb = 0.0
+        self._last_sample: Optional[float] = None
+
+    def get(self, in_flight: int) -> int:
+        """
+        Return how many jobs may be in flight now.
+
+        Args:
+            in_flight: Number of jobs currently submitted and not finished
+
+        Returns:
+            The current limit, or in_flight (but at least 1) when memory is
+            too low to start another job
+        """
+        now = time.monotonic()
+        if now - self._last_adjust >= ADAPTIVE_ADJUST_INTERVAL:
+            self._last_adjust = now
+            load = os.getloadavg()[0]
+            if load > self.cpus and self.current > self.min_jobs:
+                self.current -= 1
+            elif (
+                load < self.cpus - 1
+                and in_flight >= self.current
+                and self.current < self.max_jobs
+            ):
+                self.current += 1
+            self.low = min(self.low, self.current)
+            self.high = max(self.high, self.current)
+            logger.debug(f"Load {load:.1f}: concurrency limit {self.current}")
+
+        mem_available = read_mem_available_kb()
+        if mem_available is not None:
+            # Walking /proc is too slow to do on every submission and poll
+            if (
+                self._last_sample is None
+                or now - self._last_sample >= ADAPTIVE_ADJUST_INTERVAL
+            ):
+                self._last_sample = now
+                if in_flight:
+                    self._per_job_kb = descendant_rss_kb(os.getpid()) / in_flight
+            memory_bound = mem_available - self._per_job_kb < self.min_free_kb
+            if memory_bound != self._memory_bound:
+                self._memory_bound = memory_bound
+                logger.debug(
+                    f"{mem_available // 1024} MiB available: "
+                    f"{'holding back' if memory_bound else 'resuming'} new updates"
+                )
+            if memory_bound:
+                return max(in_flight, 1)
+
+        return self.current
 
 
 def setup_logging(verbose: bool) -> None:
@@ -172,55 +667,701 @@ def setup_logging(verbose: bool) -> None:
     )
 
 
+def get_updater_path(llvm_root: Path, updater_script: str) -> Path:
+    """Return the path of an updater script under the LLVM source root."""
+    return llvm_root / UPDATER_DIR / updater_script
+
+
+def make_updater_env(llvm_bin_dir: Optional[Path]) -> Optional[dict[str, str]]:
+    """
+    Build the environment for running updater scripts.
+
+    Args:
+        llvm_bin_dir: Optional path to LLVM build bin directory
+
+    Returns:
+        A copy of the environment with llvm_bin_dir prepended to PATH, or None
+        to inherit the current environment unchanged
+    """
+    if llvm_bin_dir is None:
+        return None
+
+    env = os.environ.copy()
+    current_path = env.get("PATH", "")
+    env["PATH"] = (
+        f"{llvm_bin_dir}{os.pathsep}{current_path}"
+        if current_path
+        else str(llvm_bin_dir)
+    )
+    return env
+
+
+def compute_cache_salt(llvm_root: Path, llvm_bin_dir: Optional[Path]) -> str:
+    """
+    Fingerprint the tool binaries and updater scripts for the skip cache.
+
+    Tool binaries are identified by their path, size, and mtime, which is
+    cheap and changes on every rebuild. Updater scripts and the
+    UpdateTestChecks library are hashed by contents.
+
+    Args:
+        llvm_root: Path to LLVM source root directory
+        llvm_bin_dir: Optional path to LLVM build bin directory
+
+    Returns:
+        Hex digest covering all inputs of the updates besides the tests
+    """
+    h = hashlib.sha256()
+
+    search_path = str(llvm_bin_dir) if llvm_bin_dir is not None else None
+    for tool in CACHE_KEY_TOOLS:
+        tool_path = shutil.which(tool, path=search_path)
+        h.update(f"{tool}={tool_path}".encode())
+        if tool_path is not None:
+            st = os.stat(tool_path)
+            h.update(f":{st.st_size}:{st.st_mtime_ns}".encode())
+        h.update(b"\0")
+
+    utils_dir = llvm_root / UPDATER_DIR
+    scripts = [utils_dir / updater_script for updater_script in TEST_UPDATERS]
+    scripts += sorted((utils_dir / "UpdateTestChecks").glob("*.py"))
+    for script in scripts:
+        h.update(str(script).encode())
+        try:
+            h.update(script.read_bytes())
+        except OSError:
+            pass
+        h.update(b"\0")
+
+    return h.hexdigest()
+
+
+def file_digest(path: Path) -> Optional[bytes]:
+    """Return a digest of a file's contents, or None if it cannot be read."""
+    try:
+        return hashlib.sha256(path.read_bytes()).digest()
+    except OSError:
+        return None
+
+
+def max_rss_kb(rusage: resource.struct_rusage) -> int:
+    """Return the peak RSS of a resource usage record in KiB."""
+    # ru_maxrss is in bytes on macOS and in KiB elsewhere
+    if sys.platform == "darwin":
+        return rusage.ru_maxrss // 1024
+    return rusage.ru_maxrss
+
+
+def describe_tests(test_paths: list[Path]) -> str:
+    """Describe a list of test files for log messages."""
+    if len(test_paths) == 1:
+        return f"test {test_paths[0]}"
+    return f"{len(test_paths)} tests ({test_paths[0]}, ...)"
+
+
 def run_update(
     llvm_root: Path,
     llvm_bin_dir: Optional[Path],
     updater_script: str,
-    test_path: Path,
+    test_paths: list[Path],
     verbose: bool,
-) -> None:
+) -> ResourceUsage:
     """
-    Run the test updater script on a test file.
+    Run the test updater script on one or more test files.
 
     Args:
         llvm_root: Path to LLVM source root directory
         llvm_bin_dir: Optional path to LLVM build bin directory
         updater_script: Name of the updater script to run
-        test_path: Path to the test file to update
+        test_paths: Paths to the test files to update
         verbose: Whether to show updater output
 
+    Returns:
+        CPU time and peak RSS of the updater process and its exit status
+
     Raises:
         TestUpdateError: If the updater script fails
     """
-    updater_path = llvm_root / "llvm" / "utils" / updater_script
+    updater_path = get_updater_path(llvm_root, updater_script)
 
     if not updater_path.exists():
         raise TestUpdateError(f"Updater script not found: {updater_path}")
 
     stdout = None if verbose else subprocess.DEVNULL
     stderr = None if verbose else subprocess.DEVNULL
-    env = None
-    if llvm_bin_dir is not None:
-        env = os.environ.copy()
-        current_path = env.get("PATH", "")
-        env["PATH"] = (
-            f"{llvm_bin_dir}{os.pathsep}{current_path}"
-            if current_path
-            else str(llvm_bin_dir)
+
+    cmd = [str(updater_path), *map(str, test_paths)]
+    proc = subprocess.Popen(
+        cmd, stdout=stdout, stderr=stderr, env=make_updater_env(llvm_bin_dir)
+    )
+    # Reap the child ourselves to get its resource usage
+    _, status, rusage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+
+    usage = ResourceUsage(
+        cpu_time=rusage.ru_utime + rusage.ru_stime,
+        max_rss_kb=max_rss_kb(rusage),
+        exit_status=proc.returncode,
+    )
+    if proc.returncode != 0:
+        e = subprocess.CalledProcessError(proc.returncode, cmd)
+        raise TestUpdateError(
+            f"Failed to update {describe_tests(test_paths)} with {updater_script}: {e}",
+            usage,
         )
+    return usage
+
+
+def init_worker(llvm_root: Path, llvm_bin_dir: Optional[Path], verbose: bool) -> None:
+    """
+    Initialize a worker process of the in-process updater pool.
+
+    Makes the UpdateTestChecks package importable and puts the LLVM tools on
+    PATH, mirroring what the subprocess path sets up for every invocation.
+
+    Args:
+        llvm_root: Path to LLVM source root directory
+        llvm_bin_dir: Optional path to LLVM build bin directory
+        verbose: Whether verbose logging is enabled
+    """
+    setup_logging(verbose)
+    sys.path.insert(0, str(llvm_root / UPDATER_DIR))
+    env = make_updater_env(llvm_bin_dir)
+    if env is not None:
+        os.environ.update(env)
+
 
+def load_updater_module(llvm_root: Path, updater_script: str) -> ModuleType:
+    """
+    Import an updater script as a module, once per worker process.
+
+    Args:
+        llvm_root: Path to LLVM source root directory
+        updater_script: Name of the updater script to import
+
+    Returns:
+        The imported updater module
+
+    Raises:
+        TestUpdateError: If the updater script cannot be imported
+    """
+    module = _updater_modules.get(updater_script)
+    if module is not None:
+        return module
+
+    updater_path = get_updater_path(llvm_root, updater_script)
+    spec = importlib.util.spec_from_file_location(
+        Path(updater_script).stem, updater_path
+    )
+    if spec is None or spec.loader is None:
+        raise TestUpdateError(f"Cannot import updater script: {updater_path}")
+
+    module = importlib.util.module_from_spec(spec)
     try:
-        subprocess.run(
-            [str(updater_path), str(test_path)],
-            stdout=stdout,
-            stderr=stderr,
-            env=env,
-            check=True,
-        )
-    except subprocess.CalledProcessError as e:
+        spec.loader.exec_module(module)
+    except Exception as e:
+        raise TestUpdateError(f"Failed to import {updater_path}: {e}") from e
+
+    if not callable(getattr(module, "main", None)):
+        raise TestUpdateError(f"Updater script has no main(): {updater_path}")
+
+    _updater_modules[updater_script] = module
+    return module
+
+
+@contextlib.contextmanager
+def redirect_output_to_devnull() -> Iterator[None]:
+    """
+    Redirect stdout and stderr of this process to /dev/null.
+
+    The redirection happens at the file descriptor level so that the output
+    of tools spawned by the updater scripts is discarded too.
+    """
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved_fds = [os.dup(1), os.dup(2)]
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    try:
+        os.dup2(devnull, 1)
+        os.dup2(devnull, 2)
+        yield
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(saved_fds[0], 1)
+        os.dup2(saved_fds[1], 2)
+        for fd in saved_fds + [devnull]:
+            os.close(fd)
+
+
+def run_update_in_process(
+    llvm_root: Path,
+    updater_script: str,
+    test_paths: list[Path],
+    verbose: bool,
+) -> ResourceUsage:
+    """
+    Run the test updater script on one or more test files in this process.
+
+    The updater module is imported on first use and its main() is called with
+    a patched sys.argv. Must only be called from a worker initialized with
+    init_worker().
+
+    Args:
+        llvm_root: Path to LLVM source root directory
+        updater_script: Name of the updater script to run
+        test_paths: Paths to the test files to update
+        verbose: Whether to show updater output
+
+    Returns:
+        CPU time used by this worker and the tools it ran during the update,
+        the worker's peak RSS so far, and the exit status of main()
+
+    Raises:
+        TestUpdateError: If the updater script cannot be imported or fails
+    """
+    module = load_updater_module(llvm_root, updater_script)
+    updater_path = get_updater_path(llvm_root, updater_script)
+
+    self_before = resource.getrusage(resource.RUSAGE_SELF)
+    children_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    saved_argv = sys.argv
+    sys.argv = [str(updater_path), *map(str, test_paths)]
+    try:
+        with contextlib.nullcontext() if verbose else redirect_output_to_devnull():
+            try:
+                ret = module.main()
+            except SystemExit as e:
+                ret = e.code
+    except Exception as e:
         raise TestUpdateError(
-            f"Failed to update test {test_path} with {updater_script}: {e}"
+            f"Failed to update {describe_tests(test_paths)} with {updater_script} "
+            f"in-process: {e!r}"
         ) from e
+    finally:
+        sys.argv = saved_argv
+
+    self_after = resource.getrusage(resource.RUSAGE_SELF)
+    children_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    usage = ResourceUsage(
+        cpu_time=sum(
+            after.ru_utime + after.ru_stime - before.ru_utime - before.ru_stime
+            for before, after in (
+                (self_before, self_after),
+                (children_before, children_after),
+            )
+        ),
+        max_rss_kb=max(max_rss_kb(self_after), max_rss_kb(children_after)),
+        exit_status=ret if isinstance(ret, int) else (0 if ret is None else 1),
+    )
+    if usage.exit_status != 0:
+        raise TestUpdateError(
+            f"Failed to update {describe_tests(test_paths)} with {updater_script} "
+            f"in-process: exit status {ret}",
+            usage,
+        )
+    return usage
+
+
+def update_tests(
+    updater_script: str, test_paths: list[Path], config: Config
+) -> ResourceUsage:
+    """
+    Update test files with the given updater script, as configured.
+
+    In in-process mode, a failing in-process update is retried in a
+    subprocess before it is reported as a failure.
+
+    Args:
+        updater_script: Name of the updater script to run
+        test_paths: Paths to the test files to update
+        config: Configuration object
+
+    Returns:
+        Resources used by the successful updater invocation
+
+    Raises:
+        TestUpdateError: If the update fails
+    """
+    if config.in_process:
+        try:
+            return run_update_in_process(
+                config.llvm_src_root, updater_script, test_paths, config.verbose
+            )
+        except TestUpdateError as e:
+            logger.debug(f"{e}; retrying in a subprocess.")
+
+    return run_update(
+        config.llvm_src_root,
+        config.llvm_bin_dir,
+        updater_script,
+        test_paths,
+        config.verbose,
+    )
+
+
+def find_build_dir(llvm_bin_dir: Path) -> Path:
+    """
+    Find the ninja build tree that produces the binaries in a bin directory.
+
+    Args:
+        llvm_bin_dir: Path to LLVM build bin directory
+
+    Returns:
+        The build directory containing build.ninja
+
+    Raises:
+        TestUpdateError: If no build.ninja is found
+    """
+    for build_dir in (llvm_bin_dir.parent, llvm_bin_dir):
+        if (build_dir / "build.ninja").is_file():
+            return build_dir
+    raise TestUpdateError(f"No ninja build tree found for {llvm_bin_dir}")
+
+
+def find_stale_tools(build_dir: Path, tools: list[str]) -> list[str]:
+    """
+    Ask ninja which of the given tool targets are out of date.
+
+    Each target is checked with a separate dry run, all run in parallel.
+
+    Args:
+        build_dir: Path to the ninja build directory
+        tools: Names of the tool targets to check
+
+    Returns:
+        The tools that ninja would rebuild, in the given order
+
+    Raises:
+        TestUpdateError: If ninja fails, e.g. for an unknown target
+    """
+
+    def is_stale(tool: str) -> bool:
+        result = subprocess.run(
+            ["ninja", "-C", str(build_dir), "-n", tool],
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            raise TestUpdateError(
+                f"Failed to check target {tool} in {build_dir}: "
+                f"{result.stderr.strip() or result.stdout.strip()}"
+            )
+        return "no work to do" not in result.stdout
+
+    with ThreadPoolExecutor(max_workers=len(tools) or 1) as executor:
+        stale = list(executor.map(is_stale, tools))
+    return [tool for tool, is_out_of_date in zip(tools, stale) if is_out_of_date]
+
+
+def rebuild_tools(llvm_bin_dir: Path, tools: list[str], verbose: bool) -> None:
+    """
+    Rebuild the given tools if ninja reports them out of date.
+
+    Only the stale tool targets are built, so a full build of the tree is
+    not needed before updating tests.
+
+    Args:
+        llvm_bin_dir: Path to LLVM build bin directory
+        tools: Names of the tool targets needed by the updates
+        verbose: Whether to show ninja output
+
+    Raises:
+        TestUpdateError: If ninja is unavailable or the rebuild fails
+    """
+    if shutil.which("ninja") is None:
+        raise TestUpdateError("ninja not found in PATH")
+
+    build_dir = find_build_dir(llvm_bin_dir)
+    stale = find_stale_tools(build_dir, tools)
+    if not stale:
+        logger.info(f"Tools are up to date: {', '.join(tools)}")
+        return
+
+    logger.info(f"Rebuilding out-of-date tool(s): {', '.join(stale)}...")
+    result = subprocess.run(
+        ["ninja", "-C", str(build_dir), *stale],
+        stdout=None if verbose else subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+    )
+    if result.returncode != 0:
+        output = "" if verbose else "\n" + result.stdout.strip()
+        raise TestUpdateError(f"Failed to rebuild {', '.join(stale)}{output}")
+
+
+def peek_updater(test_path: Path) -> Optional[str]:
+    """
+    Return the updater script named in a test's first line, without logging.
+
+    Args:
+        test_path: Path to the test file
+
+    Returns:
+        The updater script name, or None if the test cannot be updated
+    """
+    try:
+        with test_path.open("r", encoding="utf-8") as f:
+            first_line = f.readline()
+    except (IOError, UnicodeDecodeError):
+        return None
+
+    return match_updater(first_line)
+
+
+def match_updater(first_line: str) -> Optional[str]:
+    """
+    Return the updater script named in an autogenerated test header.
+
+    Args:
+        first_line: First line of a test file
+
+    Returns:
+        The updater script name, or None if the line is not a known
+        autogenerated header
+    """
+    if "autogenerated" not in first_line.lower():
+        return None
+
+    for updater_script in TEST_UPDATERS:
+        if updater_script in first_line:
+            return updater_script
+    return None
+
+
+def required_tools(test_paths: Optional[list[Path]]) -> list[str]:
+    """
+    Determine which LLVM tools the updates of the given tests run.
+
+    Args:
+        test_paths: Paths to the test files, or None if the tests are not
+            known in advance, in which case every updater tool is required
+
+    Returns:
+        Sorted names of the required tools
+    """
+    if test_paths is None:
+        test_kinds = set(TEST_UPDATERS.values())
+    else:
+        test_kinds = {
+            TEST_UPDATERS[updater_script]
+            for updater_script in map(peek_updater, test_paths)
+            if updater_script is not None
+        }
+    return sorted({tool for kind in test_kinds for tool in UPDATER_TOOLS[kind]})
+
+
+class HeaderIndex:
+    """
+    Persisted index mapping test files to the updater in their header.
+
+    The index covers the test suite directories of one LLVM source tree and
+    is refreshed by walking them in parallel with os.scandir. Only files whose
+    mtime or size changed since the last refresh have their first
+    HEADER_PEEK_BYTES bytes read again.
+    """
+
+    def __init__(self, cache_dir: Path, llvm_root: Path):
+        """
+        Initialize the index.
+
+        Args:
+            cache_dir: Directory holding the index file
+            llvm_root: LLVM source root directory the index covers
+        """
+        root_key = hashlib.sha256(str(llvm_root).encode()).hexdigest()[:16]
+        self.path = cache_dir / f"header-index-{root_key}.json"
+        self.llvm_root = llvm_root
+        # Maps path relative to llvm_root to (mtime_ns, size, updater_script)
+        self._entries: dict[str, tuple[int, int, Optional[str]]] = {}
+
+    def load(self) -> None:
+        """Load the index from disk. A missing or corrupt file is ignored."""
+        entries = load_state_file(self.path)
+        if isinstance(entries, dict):
+            self._entries = {path: tuple(entry) for path, entry in entries.items()}
+
+    def save(self) -> None:
+        """Write the index to disk."""
+        save_state_file(self.path, self._entries)
+
+    def refresh(self, roots: list[Path], jobs: int) -> tuple[int, int]:
+        """
+        Bring the index up to date for the given directory trees.
+
+        Entries under the roots for files that no longer exist are dropped.
+
+        Args:
+            roots: Directories under llvm_root to walk
+            jobs: Number of directories to scan in parallel
+
+        Returns:
+            Tuple of (files seen, files whose header was read)
+        """
+        prefix_len = len(str(self.llvm_root)) + 1
+        scanned: dict[str, tuple[int, int, Optional[str]]] = {}
+        headers_read = 0
+
+        def scan_dir(directory: str) -> tuple[list[str], list[tuple], int]:
+            subdirs = []
+            files = []
+            read = 0
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        if entry.name.startswith("."):
+                            continue
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in SCAN_EXCLUDED_DIRS:
+                                subdirs.append(entry.path)
+                            continue
+                        if not entry.is_file(follow_symlinks=False):
+                            continue
+
+                        st = entry.stat(follow_symlinks=False)
+                        rel = entry.path[prefix_len:]
+                        old = self._entries.get(rel)
+                        if old and old[0] == st.st_mtime_ns and old[1] == st.st_size:
+                            files.append((rel, old))
+                            continue
+
+                        files.append(
+                            (rel, (st.st_mtime_ns, st.st_size, peek_header(entry.path)))
+                        )
+                        read += 1
+            except OSError as e:
+                logger.debug(f"Cannot scan {directory}: {e}")
+            return subdirs, files, read
+
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            pending = {executor.submit(scan_dir, str(root)) for root in roots}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    subdirs, files, read = future.result()
+                    pending.update(executor.submit(scan_dir, d) for d in subdirs)
+                    scanned.update(files)
+                    headers_read += read
+
+        root_prefixes = tuple(str(root)[prefix_len:] + os.sep for root in roots)
+        self._entries = {
+            path: entry
+            for path, entry in self._entries.items()
+            if not path.startswith(root_prefixes)
+        }
+        self._entries.update(scanned)
+        return len(scanned), headers_read
+
+    def select(self, globs: list[str], kinds: list[str]) -> list[Path]:
+        """
+        Select autogenerated tests by path pattern and updater type.
+
+        Args:
+            globs: Patterns matched against paths relative to llvm_root. A
+                pattern without wildcards also matches everything below it.
+                An empty list selects every path.
+            kinds: Test kinds from TEST_UPDATERS to select. An empty list
+                selects every kind.
+
+        Returns:
+            Sorted absolute paths of the selected tests
+        """
+        selected = []
+        for path, (_, _, updater_script) in self._entries.items():
+            if updater_script is None:
+                continue
+            if kinds and TEST_UPDATERS.get(updater_script) not in kinds:
+                continue
+            if globs and not any(
+                fnmatch.fnmatchcase(path, pattern)
+                or path.startswith(pattern.rstrip("/") + "/")
+                for pattern in globs
+            ):
+                continue
+            selected.append(self.llvm_root / path)
+        return sorted(selected)
+
+
+def peek_header(path: str) -> Optional[str]:
+    """
+    Return the updater script named in a file's header, reading only its start.
+
+    Args:
+        path: Path to the file
+
+    Returns:
+        The updater script name, or None if the file is not an autogenerated
+        test or cannot be read
+    """
+    try:
+        with open(path, "rb") as f:
+            head = f.read(HEADER_PEEK_BYTES)
+    except OSError:
+        return None
+    first_line = head.split(b"\n", 1)[0].decode("utf-8", errors="replace")
+    return match_updater(first_line)
+
+
+def find_scan_roots(llvm_root: Path, globs: list[str]) -> list[Path]:
+    """
+    Find the smallest set of test directories to walk for the given patterns.
+
+    Args:
+        llvm_root: LLVM source root directory
+        globs: Patterns relative to llvm_root, or an empty list for all tests
+
+    Returns:
+        Existing directories covering every test the patterns can match
+    """
+    suite_dirs = sorted(set(TEST_SUITE_DIRS.values()))
+    candidates = []
+    for pattern in globs or [""]:
+        literal_parts = []
+        for part in pattern.strip("/").split("/"):
+            if not part or any(c in part for c in "*?["):
+                break
+            literal_parts.append(part)
+        literal_dir = "/".join(literal_parts)
+        while literal_dir and not (llvm_root / literal_dir).is_dir():
+            literal_dir = literal_dir.rpartition("/")[0]
+
+        for suite_dir in suite_dirs:
+            if literal_dir == suite_dir or literal_dir.startswith(suite_dir + "/"):
+                candidates.append(literal_dir)
+            elif not literal_dir or suite_dir.startswith(literal_dir + "/"):
+                candidates.append(suite_dir)
+
+    roots: list[str] = []
+    for candidate in sorted(set(candidates)):
+        if not any(candidate.startswith(root + "/") for root in roots):
+            roots.append(candidate)
+    return [llvm_root / root for root in roots if (llvm_root / root).is_dir()]
+
+
+def select_tests(config: Config, globs: list[str], kinds: list[str]) -> list[Path]:
+    """
+    Select tests to update from the header index, refreshing it first.
+
+    Args:
+        config: Configuration object
+        globs: Patterns relative to the LLVM source root
+        kinds: Test kinds from TEST_UPDATERS
+
+    Returns:
+        Sorted absolute paths of the selected tests
+    """
+    start_time = time.monotonic()
+    index = HeaderIndex(config.cache_dir, config.llvm_src_root)
+    index.load()
+    roots = find_scan_roots(config.llvm_src_root, globs)
+    seen, read = index.refresh(roots, config.jobs)
+    index.save()
+    test_paths = index.select(globs, kinds)
+    logger.info(
+        f"Selected {len(test_paths)} test(s) from {seen} indexed file(s) "
+        f"({read} header(s) read) in {(time.monotonic() - start_time) * 1000:.0f}ms."
+    )
+    return test_paths
 
 
 def detect_updater(test_path: Path) -> Optional[tuple[str, str]]:
@@ -284,46 +1425,269 @@ def resolve_test_path(
 
         test_path = llvm_root / test_dir / test_path_str
 
-    return test_path.resolve()
+    return test_path.resolve()
+
+
+def prepare_update_target(test_path: Path, config: Config) -> Path:
+    """
+    Return the file the updater should rewrite for a test.
+
+    In --diff-only mode this is a fresh copy of the test in the scratch
+    directory, so the checkout is never modified. The copy keeps the test's
+    file name, since updaters may look at its extension.
+
+    Args:
+        test_path: Path to the test file
+        config: Configuration object
+
+    Returns:
+        The path to pass to the updater script
+
+    Raises:
+        TestUpdateError: If the scratch copy cannot be made
+    """
+    if config.scratch_dir is None:
+        return test_path
+
+    key = hashlib.sha256(str(test_path).encode()).hexdigest()[:16]
+    target = config.scratch_dir / key / test_path.name
+    try:
+        target.parent.mkdir(exist_ok=True)
+        shutil.copyfile(test_path, target)
+    except OSError as e:
+        raise TestUpdateError(f"Failed to copy {test_path} to scratch: {e}") from e
+    return target
+
+
+def write_test_diff(test_path: Path, target: Path, config: Config) -> Path:
+    """
+    Write the unified diff from a test to its updated scratch copy.
+
+    The diff is written next to the copy, so it stays in the scratch
+    directory until the combined patch is assembled.
+
+    Args:
+        test_path: Path to the original test file
+        target: Path to the updated scratch copy
+        config: Configuration object
+
+    Returns:
+        Path to the diff file
+    """
+    try:
+        name = str(test_path.relative_to(config.llvm_src_root))
+    except ValueError:
+        name = str(test_path).lstrip("/")
+
+    with test_path.open("r", encoding="utf-8", errors="surrogateescape") as f:
+        old_lines = f.readlines()
+    with target.open("r", encoding="utf-8", errors="surrogateescape") as f:
+        new_lines = f.readlines()
+
+    diff_path = target.parent / "diff"
+    with diff_path.open("w", encoding="utf-8", errors="surrogateescape") as f:
+        for line in difflib.unified_diff(
+            old_lines, new_lines, fromfile=f"a/{name}", tofile=f"b/{name}"
+        ):
+            f.write(line)
+            if not line.endswith("\n"):
+                f.write("\n\\ No newline at end of file\n")
+    return diff_path
+
+
+def process_test_file(test_path: Path, config: Config) -> TestResult:
+    """
+    Process a single test file and update it if applicable.
+
+    Args:
+        test_path: Path to the test file
+        config: Configuration object
+
+    Returns:
+        TestResult recording whether processing succeeded and how long the
+        update took
+    """
+    logger.debug(f"Processing {test_path}...")
+
+    if not test_path.exists():
+        logger.error(f"Test file does not exist: {test_path}")
+        return TestResult(test_path, success=False)
+
+    result = detect_updater(test_path)
+    if result is None:
+        return TestResult(test_path, success=False)
+
+    updater_script, test_kind = result
+    logger.debug(f"Test {test_path} is a {test_kind} test. Updating...")
+
+    digest = file_digest(test_path)
+    start_time = time.monotonic()
+    diff_path = None
+    target = test_path
+    try:
+        target = prepare_update_target(test_path, config)
+        usage = update_tests(updater_script, [target], config)
+        changed = file_digest(target) != digest
+        if changed and config.scratch_dir is not None:
+            diff_path = write_test_diff(test_path, target, config)
+        logger.debug(f"Test {test_path} updated successfully.")
+        success = True
+    except TestUpdateError as e:
+        logger.error(str(e))
+        usage = e.usage or ResourceUsage()
+        changed = file_digest(target) != digest
+        success = False
+
+    return TestResult(
+        test_path,
+        success,
+        time.monotonic() - start_time,
+        updater_script=updater_script,
+        usage=usage,
+        changed=changed,
+        diff_path=diff_path,
+    )
 
 
-def process_test_file(test_path: Path, config: Config) -> bool:
+def process_test_batch(
+    updater_script: str,
+    test_paths: list[Path],
+    config: Config,
+    digests: Optional[list[Optional[bytes]]] = None,
+) -> list[TestResult]:
     """
-    Process a single test file and update it if applicable.
+    Update a batch of test files with a single updater invocation.
+
+    If the invocation fails, the batch is bisected and each half is retried,
+    down to single tests, so that only the failing tests are reported.
 
     Args:
-        test_path: Path to the test file
+        updater_script: Name of the updater script shared by all tests
+        test_paths: Paths to the test files
         config: Configuration object
+        digests: Digests of the tests before they were first updated, when
+            retrying part of a failed batch whose invocation may already have
+            rewritten some of them
 
     Returns:
-        True if processing succeeded, False otherwise
+        A TestResult for each test. The wall and CPU time of a successful
+        batch are split between its tests in proportion to their file sizes.
     """
-    logger.debug(f"Processing {test_path}...")
+    logger.debug(f"Updating {describe_tests(test_paths)} with {updater_script}...")
+
+    if digests is None:
+        digests = [file_digest(test_path) for test_path in test_paths]
+    start_time = time.monotonic()
+    targets = test_paths
+    try:
+        targets = [prepare_update_target(p, config) for p in test_paths]
+        usage = update_tests(updater_script, targets, config)
+    except TestUpdateError as e:
+        if len(test_paths) == 1:
+            logger.error(str(e))
+            return [
+                TestResult(
+                    test_paths[0],
+                    False,
+                    time.monotonic() - start_time,
+                    updater_script=updater_script,
+                    usage=e.usage or ResourceUsage(),
+                    changed=file_digest(targets[0]) != digests[0],
+                )
+            ]
+
+        logger.debug(f"{e}; bisecting the batch.")
+        mid = len(test_paths) // 2
+        return process_test_batch(
+            updater_script, test_paths[:mid], config, digests[:mid]
+        ) + process_test_batch(updater_script, test_paths[mid:], config, digests[mid:])
+
+    wall_time = time.monotonic() - start_time
+    sizes = []
+    for test_path in test_paths:
+        try:
+            sizes.append(test_path.stat().st_size)
+        except OSError:
+            sizes.append(0)
+    total_size = sum(sizes) or 1
+
+    results = []
+    for test_path, target, size, digest in zip(test_paths, targets, sizes, digests):
+        changed = file_digest(target) != digest
+        diff_path = None
+        if changed and config.scratch_dir is not None:
+            diff_path = write_test_diff(test_path, target, config)
+        results.append(
+            TestResult(
+                test_path,
+                True,
+                wall_time * size / total_size,
+                updater_script=updater_script,
+                usage=ResourceUsage(
+                    cpu_time=usage.cpu_time * size / total_size,
+                    max_rss_kb=usage.max_rss_kb,
+                    exit_status=usage.exit_status,
+                ),
+                changed=changed,
+                batch_size=len(test_paths),
+                diff_path=diff_path,
+            )
+        )
+    return results
+
+
+def find_updater(test_path: Path) -> Optional[str]:
+    """
+    Find the updater script for a test file that is about to be batched.
 
+    Args:
+        test_path: Path to the test file
+
+    Returns:
+        The updater script name, or None (after logging why) if the test does
+        not exist or cannot be updated
+    """
     if not test_path.exists():
         logger.error(f"Test file does not exist: {test_path}")
-        return False
+        return None
 
     result = detect_updater(test_path)
-    if result is None:
-        return False
+    return result[0] if result is not None else None
 
-    updater_script, test_kind = result
-    logger.debug(f"Test {test_path} is a {test_kind} test. Updating...")
 
-    try:
-        run_update(
-            config.llvm_src_root,
-            config.llvm_bin_dir,
-            updater_script,
-            test_path,
-            config.verbose,
-        )
-        logger.debug(f"Test {test_path} updated successfully.")
-        return True
-    except TestUpdateError as e:
-        logger.error(str(e))
-        return False
+def make_batches(
+    test_paths: list[Path], batch_size: int
+) -> tuple[list[tuple[str, list[Path]]], list[Path]]:
+    """
+    Group test files by their updater script into batches.
+
+    Tests keep their relative order within each updater group.
+
+    Args:
+        test_paths: Paths to the test files
+        batch_size: Maximum number of tests per batch
+
+    Returns:
+        A tuple of (batches, rejected). Each batch is a tuple of
+        (updater_script, test_paths). rejected lists the tests that do not
+        exist or have no known updater.
+    """
+    groups: dict[str, list[Path]] = {}
+    rejected: list[Path] = []
+
+    for test_path in test_paths:
+        updater_script = find_updater(test_path)
+        if updater_script is None:
+            rejected.append(test_path)
+        else:
+            groups.setdefault(updater_script, []).append(test_path)
+
+    batches = [
+        (updater_script, paths[i : i + batch_size])
+        for updater_script, paths in groups.items()
+        for i in range(0, len(paths), batch_size)
+    ]
+    return batches, rejected
 
 
 def parse_test_path(line: str) -> Optional[tuple[str, Optional[str]]]:
@@ -369,7 +1733,7 @@ def load_test_list(test_file: Path) -> list[tuple[str, Optional[str]]]:
     - Lit test output format (e.g., "LLVM :: CodeGen/test.ll")
 
     Args:
-        test_file: Path to file containing list of tests
+        test_file: Path to file containing list of tests, or "-" for stdin
 
     Returns:
         List of tuples (test_path, suite_prefix) for non-empty lines.
@@ -379,8 +1743,11 @@ def load_test_list(test_file: Path) -> list[tuple[str, Optional[str]]]:
         TestUpdateError: If the file cannot be read
     """
     try:
-        with test_file.open("r", encoding="utf-8") as f:
-            lines = f.readlines()
+        if str(test_file) == "-":
+            lines = sys.stdin.readlines()
+        else:
+            with test_file.open("r", encoding="utf-8") as f:
+                lines = f.readlines()
     except IOError as e:
         raise TestUpdateError(f"Failed to read test list file {test_file}: {e}") from e
 
@@ -393,6 +1760,120 @@ def load_test_list(test_file: Path) -> list[tuple[str, Optional[str]]]:
     return test_paths
 
 
+def read_lit_lines(
+    stream: TextIO, follow: bool, poll_interval: float = 0.5
+) -> Iterator[str]:
+    """
+    Yield complete lines of lit output as they are written.
+
+    Args:
+        stream: Stream to read lit output from
+        follow: Whether to keep waiting for more data at end of file until the
+            end of lit's run shows up, for a file lit is still writing
+        poll_interval: Seconds to sleep between checks for more data
+
+    Yields:
+        Lines of lit output, up to and including the end-of-run line
+    """
+    pending = ""
+    while True:
+        line = stream.readline()
+        if not line:
+            if not follow:
+                break
+            time.sleep(poll_interval)
+            continue
+
+        # A follower may see the writer's last line before its newline
+        pending += line
+        if not pending.endswith("\n") and follow:
+            continue
+
+        line, pending = pending, ""
+        yield line
+        if follow and LIT_END_OF_RUN.match(line):
+            return
+
+    if pending:
+        yield pending
+
+
+def parse_xunit_testcase(testcase: ET.Element) -> tuple[str, Optional[str]]:
+    """
+    Recover the lit test name from a testcase of a lit xunit XML report.
+
+    lit writes classname as "<suite>.<directory>" (or "<suite>.<suite>" for
+    tests at the top of the suite) and name as the test file name.
+
+    Args:
+        testcase: The testcase element
+
+    Returns:
+        Tuple of (test_path, suite_prefix)
+    """
+    classname = testcase.get("classname", "")
+    name = testcase.get("name", "")
+    suite, _, directory = classname.partition(".")
+    if not directory or directory == suite:
+        return (name, suite or None)
+    return (f"{directory}/{name}", suite)
+
+
+def iter_lit_failures(lines: Iterable[str]) -> Iterator[tuple[str, Optional[str]]]:
+    """
+    Extract failing tests from lit output as it is read.
+
+    Supports:
+    - lit -v/-a result lines: FAIL: LLVM :: CodeGen/AMDGPU/test.ll (1 of 9)
+    - The "Failed Tests (N):" list of lit's end-of-run summary
+    - xunit XML reports written by lit --xunit-xml-output
+
+    Args:
+        lines: Lines of lit output
+
+    Yields:
+        Tuples of (test_path, suite_prefix) for failing tests, possibly with
+        duplicates
+
+    Raises:
+        TestUpdateError: If an xunit XML report is malformed
+    """
+    xml_parser: Optional[ET.XMLPullParser] = None
+    in_failed_list = False
+
+    for line in lines:
+        if xml_parser is None and LIT_XML_START.match(line):
+            xml_parser = ET.XMLPullParser(events=("end",))
+
+        if xml_parser is not None:
+            try:
+                xml_parser.feed(line)
+                for _, elem in xml_parser.read_events():
+                    if elem.tag != "testcase":
+                        continue
+                    if elem.find("failure") is not None:
+                        yield parse_xunit_testcase(elem)
+                    elem.clear()
+            except ET.ParseError as e:
+                raise TestUpdateError(f"Malformed xunit XML in lit output: {e}")
+            continue
+
+        if in_failed_list:
+            if line[:1].isspace() and line.strip():
+                result = parse_test_path(line)
+                if result:
+                    yield result
+                continue
+            in_failed_list = False
+
+        if match := LIT_FAIL_LINE.match(line):
+            result = parse_test_path(match.group(1))
+            if result:
+                yield result
+        elif LIT_FAILED_TESTS_HEADER.match(line):
+            in_failed_list = True
+
+
 def deduplicate_test_list(
     test_list: list[tuple[str, Optional[str]]], llvm_root: Path
 ) -> list[Path]:
@@ -434,6 +1915,408 @@ def deduplicate_test_list(
     return unique_paths
 
 
+def write_diff_patch(patch_path: Path, results: list[TestResult]) -> None:
+    """
+    Combine the per-test diffs of a --diff-only run into one patch.
+
+    The patch applies with "git apply" from the LLVM source root. When
+    writing to a file, the changed and unchanged tests are also listed, one
+    absolute path per line, in <patch>.changed and <patch>.unchanged, which
+    can be passed back as --test-file.
+
+    Args:
+        patch_path: Path to write the patch to, or "-" for stdout
+        results: Results of all processed tests
+
+    Raises:
+        TestUpdateError: If the patch cannot be written
+    """
+    results = sorted(results, key=lambda r: r.test_path)
+    changed = [r.test_path for r in results if r.diff_path is not None]
+    unchanged = [r.test_path for r in results if r.success and not r.changed]
+
+    try:
+        with (
+            contextlib.nullcontext(sys.stdout)
+            if str(patch_path) == "-"
+            else patch_path.open("w", encoding="utf-8", errors="surrogateescape")
+        ) as out:
+            for result in results:
+                if result.diff_path is None:
+                    continue
+                with result.diff_path.open(
+                    "r", encoding="utf-8", errors="surrogateescape"
+                ) as diff:
+                    shutil.copyfileobj(diff, out)
+
+        if str(patch_path) != "-":
+            for suffix, test_paths in (
+                (".changed", changed),
+                (".unchanged", unchanged),
+            ):
+                list_path = patch_path.with_name(patch_path.name + suffix)
+                list_path.write_text("".join(f"{p}\n" for p in test_paths))
+    except OSError as e:
+        raise TestUpdateError(f"Failed to write patch {patch_path}: {e}") from e
+
+    for test_path in changed:
+        logger.info(f"Would change: {test_path}")
+    for test_path in unchanged:
+        logger.debug(f"Unchanged: {test_path}")
+    logger.info(
+        f"Diff-only: {len(changed)} test(s) would change, "
+        f"{len(unchanged)} unchanged."
+    )
+
+
+def write_report(
+    report_path: Path, results: list[TestResult], config: Config, wall_time: float
+) -> dict[str, Any]:
+    """
+    Write a JSON report of a run with per-test timings and resource usage.
+
+    Args:
+        report_path: Path to write the report to
+        results: Results of all processed tests
+        config: Configuration object
+        wall_time: Wall time of the whole run in seconds
+
+    Returns:
+        The report as written
+
+    Raises:
+        TestUpdateError: If the report cannot be written
+    """
+    tests = []
+    for result in results:
+        try:
+            test = str(result.test_path.relative_to(config.llvm_src_root))
+        except ValueError:
+            test = str(result.test_path)
+        tests.append(
+            {
+                "test": test,
+                "updater": result.updater_script,
+                "success": result.success,
+                "wall_time": result.wall_time,
+                **asdict(result.usage),
+                "changed": result.changed,
+                "batch_size": result.batch_size,
+            }
+        )
+
+    report = {
+        "llvm_src_root": str(config.llvm_src_root),
+        "jobs": config.jobs,
+        "in_process": config.in_process,
+        "wall_time": wall_time,
+        "tests": tests,
+    }
+    try:
+        with report_path.open("w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    except OSError as e:
+        raise TestUpdateError(f"Failed to write report {report_path}: {e}") from e
+    return report
+
+
+def summarize_report(report: dict[str, Any], top: int = 10) -> str:
+    """
+    Summarize a run report: the slowest tests and a per-directory breakdown.
+
+    Args:
+        report: Report as written by write_report
+        top: Number of slowest tests to list
+
+    Returns:
+        The summary as printable text
+    """
+    tests = report.get("tests", [])
+    lines = [
+        f"{len(tests)} test(s) in {report.get('wall_time', 0.0):.1f}s "
+        f"with {report.get('jobs', '?')} worker(s)",
+        "",
+        f"Slowest {min(top, len(tests))} test(s):",
+        f"  {'wall':>8} {'cpu':>8} {'rss MiB':>8}  {'status':<8}  test",
+    ]
+    for test in sorted(tests, key=lambda t: t["wall_time"], reverse=True)[:top]:
+        status = "ok" if test["success"] else f"fail({test['exit_status']})"
+        lines.append(
+            f"  {test['wall_time']:7.1f}s {test['cpu_time']:7.1f}s "
+            f"{test['max_rss_kb'] / 1024:8.0f}  {status:<8}  {test['test']}"
+        )
+
+    dirs: dict[str, dict[str, float]] = {}
+    for test in tests:
+        stats = dirs.setdefault(
+            os.path.dirname(test["test"]),
+            {"count": 0, "wall": 0.0, "cpu": 0.0, "rss": 0, "changed": 0, "failed": 0},
+        )
+        stats["count"] += 1
+        stats["wall"] += test["wall_time"]
+        stats["cpu"] += test["cpu_time"]
+        stats["rss"] = max(stats["rss"], test["max_rss_kb"])
+        stats["changed"] += bool(test["changed"])
+        stats["failed"] += not test["success"]
+
+    lines += [
+        "",
+        "Per directory (sorted by total wall time):",
+        f"  {'tests':>6} {'wall':>9} {'cpu':>9} {'max MiB':>8} {'changed':>8} "
+        f"{'failed':>7}  directory",
+    ]
+    for directory, stats in sorted(
+        dirs.items(), key=lambda kv: kv[1]["wall"], reverse=True
+    ):
+        lines.append(
+            f"  {stats['count']:6d} {stats['wall']:8.1f}s {stats['cpu']:8.1f}s "
+            f"{stats['rss'] / 1024:8.0f} {stats['changed']:8d} {stats['failed']:7d}"
+            f"  {directory or '.'}"
+        )
+
+    return "\n".join(lines)
+
+
+class UpdateRunner:
+    """
+    Submit update jobs to a worker pool and account for their results.
+
+    Jobs may be submitted while earlier ones are still running. Results are
+    recorded in the duration history and the skip cache as jobs complete, so
+    those must not be saved before wait() returns.
+    """
+
+    def __init__(
+        self,
+        config: Config,
+        executor: Executor,
+        history: DurationHistory,
+        cache: Optional[SkipCache],
+        progress_bar: Optional[ProgressBar],
+        limit: Optional[AdaptiveLimit] = None,
+    ):
+        """
+        Initialize the runner.
+
+        Args:
+            config: Configuration object
+            executor: Worker pool to run jobs on
+            history: Duration history to record successful updates in
+            cache: Optional skip cache to record successful updates in
+            progress_bar: Optional progress bar to advance per test
+            limit: Optional adaptive limit on the number of jobs in flight.
+                Without it, all jobs are queued on the executor at once.
+        """
+        self.config = config
+        self.executor = executor
+        self.history = history
+        self.cache = cache
+        self.progress_bar = progress_bar
+        self.limit = limit
+        self.success_count = 0
+        self.failure_count = 0
+        # All results, in completion order, if a report or patch was requested
+        self.results: list[TestResult] = []
+        self._cond = threading.Condition()
+        self._outstanding = 0
+        # Tests waiting for their batch to fill up, keyed by updater script
+        self._partial_batches: dict[str, list[Path]] = {}
+
+    def submit_test(self, test_path: Path) -> None:
+        """Submit a single test to be updated."""
+        self._submit([test_path], process_test_file, test_path, self.config)
+
+    def submit_batch(self, updater_script: str, test_paths: list[Path]) -> None:
+        """Submit a batch of tests to be updated by one updater invocation."""
+        self._submit(
+            test_paths, process_test_batch, updater_script, test_paths, self.config
+        )
+
+    def add_to_batch(self, test_path: Path) -> None:
+        """
+        Queue a test for batching and submit its batch once it is full.
+
+        Args:
+            test_path: Path to the test file
+        """
+        updater_script = find_updater(test_path)
+        if updater_script is None:
+            self.record(TestResult(test_path, success=False))
+            return
+
+        batch = self._partial_batches.setdefault(updater_script, [])
+        batch.append(test_path)
+        if len(batch) >= self.config.batch_size:
+            self.submit_batch(updater_script, self._partial_batches.pop(updater_script))
+
+    def record(self, result: TestResult) -> None:
+        """Account for the result of a test. Thread-safe."""
+        with self._cond:
+            if self.config.report is not None or self.config.diff_patch is not None:
+                self.results.append(result)
+            if result.success:
+                self.success_count += 1
+                self.history.record(result.test_path, result.wall_time)
+                # In --diff-only mode, only an unchanged test is up to date
+                if self.cache is not None and not (
+                    self.config.diff_patch is not None and result.changed
+                ):
+                    self.cache.record(result.test_path)
+            else:
+                self.failure_count += 1
+
+        if self.progress_bar:
+            self.progress_bar.update(success=result.success)
+
+    def skip(self, test_path: Path) -> None:
+        """
+        Account for a test skipped because it is known to be up to date.
+
+        Only --diff-only tracks these, to list them as unchanged.
+
+        Args:
+            test_path: Path to the test file
+        """
+        if self.config.diff_patch is not None:
+            with self._cond:
+                self.results.append(TestResult(test_path, True, changed=False))
+
+    def wait(self) -> None:
+        """Submit all partial batches and wait until every job is accounted for."""
+        for updater_script, test_paths in self._partial_batches.items():
+            self.submit_batch(updater_script, test_paths)
+        self._partial_batches.clear()
+
+        with self._cond:
+            while self._outstanding:
+                self._cond.wait()
+
+    def _submit(self, test_paths: list[Path], fn, *args) -> None:
+        """Submit fn(*args), which updates test_paths, to the worker pool."""
+        self._wait_for_slot()
+        with self._cond:
+            self._outstanding += 1
+        future = self.executor.submit(fn, *args)
+        future.add_done_callback(functools.partial(self._on_done, test_paths))
+
+    def _wait_for_slot(self) -> None:
+        """Block until the adaptive limit admits another job."""
+        if self.limit is None:
+            return
+
+        while True:
+            limit = self.limit.get(self._outstanding)
+            with self._cond:
+                if self._outstanding < limit:
+                    return
+                self._cond.wait(timeout=ADAPTIVE_POLL_INTERVAL)
+
+    def _on_done(self, test_paths: list[Path], future: Future) -> None:
+        """Record the results of a completed job."""
+        try:
+            outcome = future.result()
+            results = outcome if isinstance(outcome, list) else [outcome]
+        except Exception as e:
+            logger.error(
+                f"Unexpected error processing {describe_tests(test_paths)}: {e}"
+            )
+            results = [TestResult(p, success=False) for p in test_paths]
+
+        for result in results:
+            self.record(result)
+
+        with self._cond:
+            self._outstanding -= 1
+            self._cond.notify_all()
+
+
+def create_executor(config: Config) -> Executor:
+    """Create the worker pool that runs the updates."""
+    if config.in_process:
+        return ProcessPoolExecutor(
+            max_workers=config.jobs,
+            initializer=init_worker,
+            initargs=(config.llvm_src_root, config.llvm_bin_dir, config.verbose),
+        )
+    return ThreadPoolExecutor(max_workers=config.jobs)
+
+
+def submit_test_list(
+    runner: UpdateRunner, test_paths: list[Path], history: DurationHistory
+) -> float:
+    """
+    Submit a known list of tests, longest expected update first.
+
+    Args:
+        runner: Runner to submit the tests to
+        test_paths: Unique paths of the tests to update
+        history: Duration history used to estimate update times
+
+    Returns:
+        The predicted makespan of the submitted jobs in seconds
+    """
+    config = runner.config
+    estimates = {test_path: history.estimate(test_path) for test_path in test_paths}
+    test_paths = sorted(test_paths, key=estimates.__getitem__, reverse=True)
+
+    if config.batch_size == 1:
+        for test_path in test_paths:
+            runner.submit_test(test_path)
+        return predict_makespan(
+            [estimates[test_path] for test_path in test_paths], config.jobs
+        )
+
+    batches, rejected = make_batches(test_paths, config.batch_size)
+    for test_path in rejected:
+        runner.record(TestResult(test_path, success=False))
+
+    batch_estimates = [sum(map(estimates.__getitem__, b[1])) for b in batches]
+    order = sorted(range(len(batches)), key=batch_estimates.__getitem__)[::-1]
+    for i in order:
+        runner.submit_batch(*batches[i])
+    return predict_makespan([batch_estimates[i] for i in order], config.jobs)
+
+
+def submit_lit_output(
+    runner: UpdateRunner, stream: TextIO, cache: Optional[SkipCache]
+) -> int:
+    """
+    Submit the failing tests of lit output as soon as they are read.
+
+    Args:
+        runner: Runner to submit the tests to
+        stream: Stream to read lit output from
+        cache: Optional skip cache to check tests against before submitting
+
+    Returns:
+        Number of unique failing tests found
+    """
+    config = runner.config
+    seen: set[Path] = set()
+
+    lines = read_lit_lines(stream, config.follow)
+    for test_path_str, suite_prefix in iter_lit_failures(lines):
+        resolved = resolve_test_path(test_path_str, config.llvm_src_root, suite_prefix)
+        if resolved in seen:
+            logger.debug(f"Duplicate test path: '{test_path_str}' ({resolved})")
+            continue
+        seen.add(resolved)
+
+        if cache is not None and cache.lookup(resolved):
+            logger.debug(f"Skipping {resolved}: unchanged since last update.")
+            runner.skip(resolved)
+            continue
+
+        if runner.progress_bar:
+            runner.progress_bar.add_total()
+        if config.batch_size > 1:
+            runner.add_to_batch(resolved)
+        else:
+            runner.submit_test(resolved)
+
+    return len(seen)
+
+
 def main() -> int:
     """
     Main entry point for the test updater tool.
@@ -467,6 +2350,67 @@ Supported test suite prefixes:
 
 The tool automatically maps lit test prefixes to their respective test directories.
 
+In-process mode:
+  With --in-process, a pool of long-lived worker processes imports each updater
+  script once and calls its main() for every test, avoiding interpreter startup
+  and UpdateTestChecks import per test. A test whose in-process update fails is
+  retried with the regular subprocess invocation.
+
+Selecting tests from the source tree:
+  Instead of --test-file, --select GLOB and/or --select-updater KIND pick every
+  autogenerated test under the lit test suite directories (llvm/test,
+  clang/test, ...) matching the pattern relative to the LLVM source root and
+  the updater kind (cc, llc, mir, opt, llvm-mc), e.g.:
+    update_test.py -l . --select 'llvm/test/CodeGen/AMDGPU/*' --select-updater llc
+  An index of each file's header is kept in --cache-dir and refreshed by
+  mtime, so only new or modified files are read again.
+
+Skip cache:
+  Tests that were updated successfully are remembered in a cache under
+  --cache-dir, keyed by their contents plus a fingerprint of the llc, opt,
+  clang, and llvm-mc binaries and the updater scripts. Tests whose key is
+  unchanged on a later run are skipped. Use --no-cache to update every test.
+
+Batching:
+  With --batch-size N, tests are grouped by updater script and each updater
+  invocation receives up to N tests. A failing batch is bisected down to the
+  individual tests that fail.
+
+Tool rebuild:
+  With --rebuild-tools, the tools run by the needed updaters (llc, opt, clang,
+  llvm-mc) are checked with a ninja dry run in the build tree of
+  --llvm-bin-dir, and only the out-of-date ones are rebuilt before any test is
+  updated.
+
+Diff-only mode:
+  --diff-only PATCH updates a copy of each test in a scratch directory (on
+  /dev/shm when available) instead of the checkout, and writes the combined
+  unified diff to PATCH ("-" for stdout), which applies with "git apply" from
+  the LLVM source root. The tests that would change and those that would not
+  are listed in PATCH.changed and PATCH.unchanged. Tests whose RUN lines refer
+  to files next to the test (e.g. %S/Inputs) cannot be updated this way.
+
+Adaptive concurrency:
+  With --adaptive, --jobs is the upper bound of a limit on updates in flight
+  that moves between --min-jobs and --jobs with the 1-minute load average. No
+  new update starts while /proc/meminfo's MemAvailable, minus the average RSS
+  of a running update, is below --min-free-memory.
+
+Run report:
+  --report out.json records, for each test, the updater used, wall and CPU
+  time, the updater's peak RSS, its exit status, and whether the test file
+  changed, and prints the slowest tests and a per-directory breakdown. Use
+  --summarize-report out.json to print that summary again without updating.
+  In --in-process mode, the peak RSS is the worker's high-water mark.
+
+Streaming lit output:
+  With --lit-output, --test-file is lit output rather than a list of tests, and
+  may be "-" to read from a pipe, e.g.:
+    llvm-lit -v llvm/test/CodeGen/AMDGPU | update_test.py -l . --lit-output -f -
+  Failing tests from "FAIL: ..." lines, the "Failed Tests (N):" summary, or a
+  --xunit-xml-output report are updated as soon as they are read. Add --follow
+  to read a file lit is still writing, until lit's run ends.
+
 Progress bar:
   A progress bar is shown by default when running in an interactive terminal.
   Use --no-progress to disable it (useful in CI or when redirecting output).
@@ -476,7 +2420,6 @@ Progress bar:
     parser.add_argument(
         "-l",
         "--llvm-src-root",
-        required=True,
         type=Path,
         help="LLVM source code root directory",
     )
@@ -489,11 +2432,64 @@ Progress bar:
     parser.add_argument(
         "-f",
         "--test-file",
-        required=True,
         type=Path,
-        help="File containing list of tests to be updated (one per line). "
+        help="File containing list of tests to be updated (one per line), "
+        "or '-' for stdin. "
         "Supports plain paths or lit test output format (e.g., 'LLVM :: CodeGen/test.ll')",
     )
+    parser.add_argument(
+        "--select",
+        action="append",
+        default=[],
+        metavar="GLOB",
+        help="Update autogenerated tests whose path relative to the LLVM source "
+        "root matches GLOB, instead of reading --test-file (repeatable)",
+    )
+    parser.add_argument(
+        "--select-updater",
+        action="append",
+        default=[],
+        choices=sorted(set(TEST_UPDATERS.values())),
+        metavar="KIND",
+        help="Update autogenerated tests of this kind (cc, llc, mir, opt, "
+        "llvm-mc), instead of reading --test-file (repeatable)",
+    )
+    parser.add_argument(
+        "--rebuild-tools",
+        action="store_true",
+        help="Rebuild the tools needed by the tests with ninja first, if they "
+        "are out of date (requires --llvm-bin-dir)",
+    )
+    parser.add_argument(
+        "--diff-only",
+        type=Path,
+        metavar="PATCH",
+        help="Do not modify tests; write the changes the updates would make as "
+        "a patch to PATCH ('-' for stdout)",
+    )
+    parser.add_argument(
+        "--report",
+        type=Path,
+        help="Write a JSON report with per-test timings and resource usage",
+    )
+    parser.add_argument(
+        "--summarize-report",
+        type=Path,
+        metavar="REPORT",
+        help="Print the summary of a report written by --report and exit",
+    )
+    parser.add_argument(
+        "--lit-output",
+        action="store_true",
+        help="Read --test-file as lit output and update its failing tests while "
+        "it is being read",
+    )
+    parser.add_argument(
+        "--follow",
+        action="store_true",
+        help="With --lit-output, keep reading a file that lit is still writing "
+        "until the end of the lit run",
+    )
     parser.add_argument(
         "-v",
         "--verbose",
@@ -512,10 +2508,78 @@ Progress bar:
         default=os.cpu_count() or 4,
         help="Number of parallel workers (default: CPU count)",
     )
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="Scale the number of concurrent updates between --min-jobs and "
+        "--jobs based on load and available memory",
+    )
+    parser.add_argument(
+        "--min-jobs",
+        type=int,
+        default=1,
+        help="Lower bound of concurrent updates with --adaptive (default: 1)",
+    )
+    parser.add_argument(
+        "--min-free-memory",
+        type=int,
+        default=DEFAULT_MIN_FREE_MEMORY_MB,
+        metavar="MB",
+        help="With --adaptive, do not start updates while less memory is "
+        f"available (default: {DEFAULT_MIN_FREE_MEMORY_MB} MiB)",
+    )
+    parser.add_argument(
+        "--in-process",
+        action="store_true",
+        help="Run updater scripts inside a pool of long-lived worker processes "
+        "instead of spawning a new interpreter per test",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Do not skip tests that are unchanged since their last update",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=DEFAULT_CACHE_DIR,
+        help="Directory for the skip cache and recorded test durations "
+        f"(default: {DEFAULT_CACHE_DIR})",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_CACHE_SIZE,
+        help="Maximum number of entries kept in the skip cache "
+        f"(default: {DEFAULT_CACHE_SIZE})",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1,
+        help="Maximum number of tests passed to a single updater invocation "
+        "(default: 1)",
+    )
 
     args = parser.parse_args()
     setup_logging(args.verbose)
 
+    if args.summarize_report is not None:
+        report = load_state_file(args.summarize_report)
+        if not isinstance(report, dict):
+            logger.error(f"Cannot read report {args.summarize_report}")
+            return 1
+        print(summarize_report(report))
+        return 0
+
+    select = bool(args.select or args.select_updater)
+    if args.llvm_src_root is None:
+        parser.error("the following arguments are required: -l/--llvm-src-root")
+    if (args.test_file is None) == (not select):
+        parser.error("one of -f/--test-file or --select/--select-updater is required")
+    if select and args.lit_output:
+        parser.error("--lit-output requires -f/--test-file")
+
     # Determine if we should show progress bar
     show_progress = not args.no_progress and sys.stderr.isatty()
 
@@ -523,10 +2587,31 @@ Progress bar:
         config = Config(
             llvm_src_root=args.llvm_src_root.resolve(),
             llvm_bin_dir=args.llvm_bin_dir.resolve() if args.llvm_bin_dir else None,
-            test_file=args.test_file.resolve(),
+            test_file=(
+                args.test_file
+                if args.test_file is None or str(args.test_file) == "-"
+                else args.test_file.resolve()
+            ),
             verbose=args.verbose,
             show_progress=show_progress,
             jobs=args.jobs,
+            in_process=args.in_process,
+            cache_dir=args.cache_dir.resolve(),
+            use_cache=not args.no_cache,
+            cache_size=args.cache_size,
+            batch_size=args.batch_size,
+            lit_output=args.lit_output,
+            follow=args.follow,
+            rebuild_tools=args.rebuild_tools,
+            report=args.report.resolve() if args.report else None,
+            adaptive=args.adaptive,
+            min_jobs=args.min_jobs,
+            min_free_memory_mb=args.min_free_memory,
+            diff_patch=(
+                args.diff_only
+                if args.diff_only is None or str(args.diff_only) == "-"
+                else args.diff_only.resolve()
+            ),
         )
     except (ValueError, OSError) as e:
         logger.error(f"Invalid path provided: {e}")
@@ -536,74 +2621,177 @@ Progress bar:
         logger.error(f"LLVM source root does not exist: {config.llvm_src_root}")
         return 1
 
+    if config.batch_size < 1:
+        logger.error(f"Batch size must be at least 1: {config.batch_size}")
+        return 1
+
     if config.llvm_bin_dir is not None and not config.llvm_bin_dir.is_dir():
         logger.error(f"LLVM bin directory does not exist: {config.llvm_bin_dir}")
         return 1
 
-    if not config.test_file.exists():
-        logger.error(f"Test list file does not exist: {config.test_file}")
-        return 1
+    read_stdin = str(config.test_file) == "-"
+    if config.test_file is not None and not read_stdin:
+        if not config.test_file.exists():
+            logger.error(f"Test list file does not exist: {config.test_file}")
+            return 1
 
-    try:
-        test_list = load_test_list(config.test_file)
-    except TestUpdateError as e:
-        logger.error(str(e))
+    if config.follow and (read_stdin or not config.lit_output):
+        logger.error("--follow requires --lit-output and a file to read.")
         return 1
 
-    if not test_list:
-        logger.warning("Test list file is empty.")
-        return 0
-
-    # Deduplicate test paths to avoid race conditions
-    test_paths = deduplicate_test_list(test_list, config.llvm_src_root)
+    if config.adaptive and not 1 <= config.min_jobs <= config.jobs:
+        logger.error(f"--min-jobs must be between 1 and --jobs ({config.jobs}).")
+        return 1
 
-    if not test_paths:
-        logger.warning("No unique test paths to process after deduplication.")
-        return 0
+    if config.rebuild_tools and config.llvm_bin_dir is None:
+        logger.error("--rebuild-tools requires --llvm-bin-dir.")
+        return 1
 
-    logger.info(
-        f"Processing {len(test_paths)} unique test(s) with {config.jobs} worker(s)..."
-    )
+    if config.lit_output:
+        test_paths = []
+    elif config.test_file is None:
+        test_paths = select_tests(config, args.select, args.select_updater)
+        if not test_paths:
+            logger.warning("No autogenerated tests match the selection.")
+            return 0
+    else:
+        try:
+            test_list = load_test_list(config.test_file)
+        except TestUpdateError as e:
+            logger.error(str(e))
+            return 1
+
+        if not test_list:
+            logger.warning("Test list file is empty.")
+            return 0
+
+        # Deduplicate test paths to avoid race conditions
+        test_paths = deduplicate_test_list(test_list, config.llvm_src_root)
+
+        if not test_paths:
+            logger.warning("No unique test paths to process after deduplication.")
+            return 0
+
+    # Make sure tests are not regenerated with stale binaries. This must
+    # happen before the skip cache fingerprints the binaries.
+    if config.rebuild_tools:
+        tools = required_tools(None if config.lit_output else test_paths)
+        try:
+            rebuild_tools(config.llvm_bin_dir, tools, config.verbose)
+        except TestUpdateError as e:
+            logger.error(str(e))
+            return 1
+
+    # Skip tests that are unchanged since their last successful update
+    cache = None
+    cached_paths: list[Path] = []
+    if config.use_cache:
+        cache = SkipCache(
+            config.cache_dir,
+            config.cache_size,
+            compute_cache_salt(config.llvm_src_root, config.llvm_bin_dir),
+        )
+        cache.load()
+        is_cached = {p: cache.lookup(p) for p in test_paths}
+        cached_paths = [p for p in test_paths if is_cached[p]]
+        test_paths = [p for p in test_paths if not is_cached[p]]
+        if cache.hits:
+            logger.info(f"Skipping {cache.hits} test(s) unchanged since last update.")
+
+    history = DurationHistory(config.cache_dir)
+    history.load()
+
+    if config.lit_output:
+        logger.info(
+            f"Updating failing tests from lit output with {config.jobs} worker(s)..."
+        )
+    else:
+        logger.info(
+            f"Processing {len(test_paths)} unique test(s) "
+            f"with {config.jobs} worker(s)..."
+        )
 
-    success_count = 0
-    failure_count = 0
+    start_time = time.time()
+    predicted_makespan = None
+    read_failed = False
 
     # Create progress bar if enabled
     progress_bar = None
     if config.show_progress:
         progress_bar = ProgressBar(len(test_paths), desc="Updating tests", width=40)
 
-    # Process tests in parallel
-    with ThreadPoolExecutor(max_workers=config.jobs) as executor:
-        futures = {
-            executor.submit(process_test_file, test_path, config): test_path
-            for test_path in test_paths
-        }
-
-        for future in as_completed(futures):
-            try:
-                success = future.result()
-            except Exception as e:
-                test_path = futures[future]
-                logger.error(f"Unexpected error processing {test_path}: {e}")
-                success = False
+    if config.diff_patch is not None:
+        scratch_root = DIFF_SCRATCH_ROOT if DIFF_SCRATCH_ROOT.is_dir() else None
+        scratch = tempfile.TemporaryDirectory(prefix=f"{PROG_NAME}-", dir=scratch_root)
+        config.scratch_dir = Path(scratch.name)
+        logger.debug(f"Updating scratch copies in {config.scratch_dir}")
 
-            if success:
-                success_count += 1
-            else:
-                failure_count += 1
+    limit = None
+    if config.adaptive:
+        limit = AdaptiveLimit(
+            config.min_jobs, config.jobs, config.min_free_memory_mb * 1024
+        )
 
-            if progress_bar:
-                progress_bar.update(success=success)
+    # Process tests in parallel
+    with create_executor(config) as executor:
+        runner = UpdateRunner(config, executor, history, cache, progress_bar, limit)
+        for test_path in cached_paths:
+            runner.skip(test_path)
+        if not config.lit_output:
+            predicted_makespan = submit_test_list(runner, test_paths, history)
+        else:
+            try:
+                with (
+                    contextlib.nullcontext(sys.stdin)
+                    if read_stdin
+                    else config.test_file.open("r", encoding="utf-8")
+                ) as stream:
+                    found = submit_lit_output(runner, stream, cache)
+                logger.info(f"Found {found} unique failing test(s) in lit output.")
+            except (IOError, TestUpdateError) as e:
+                logger.error(f"Failed to read lit output {config.test_file}: {e}")
+                read_failed = True
+        runner.wait()
 
     if progress_bar:
         progress_bar.close()
 
+    elapsed = time.time() - start_time
     logger.info(
-        f"Completed: {success_count} succeeded, {failure_count} failed/skipped."
+        f"Completed: {runner.success_count} succeeded, "
+        f"{runner.failure_count} failed/skipped in {elapsed:.1f}s."
     )
-
-    return 0 if failure_count == 0 else 1
+    if predicted_makespan is not None:
+        logger.info(
+            f"Makespan: predicted {predicted_makespan:.1f}s, actual {elapsed:.1f}s."
+        )
+    if limit is not None:
+        logger.info(f"Adaptive concurrency: {limit.low}-{limit.high} job(s).")
+
+    history.save()
+    if cache is not None:
+        cache.save()
+        logger.info(f"Skip cache: {cache.hits} hit(s), {cache.misses} miss(es).")
+
+    if config.diff_patch is not None:
+        try:
+            write_diff_patch(config.diff_patch, runner.results)
+        except TestUpdateError as e:
+            logger.error(str(e))
+            return 1
+        finally:
+            scratch.cleanup()
+
+    if config.report is not None:
+        try:
+            report = write_report(config.report, runner.results, config, elapsed)
+        except TestUpdateError as e:
+            logger.error(str(e))
+            return 1
+        logger.info(f"Report written to {config.report}")
+        print(summarize_report(report))
+
+    return 0 if runner.failure_count == 0 and not read_failed else 1
 
 
 if __name__ == "__main__":